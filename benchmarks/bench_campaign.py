@@ -0,0 +1,226 @@
+"""
+End-to-end benchmark of the pyrnet command line processing chain.
+
+A fake campaign of N stations x M maintenance intervals of synthetic raw logger files
+(pyrnet.synthetic) and a matching LimeSurvey maintenance report is generated in an isolated
+directory. Then `pyrnet process l1a`, `pyrnet process l1b` and `pyrnet merge` (per day) are run
+in separate processes. For each command the wall time, files/s, MB/s of the input files,
+peak RSS and the time of the processing stages (--stats) are recorded.
+
+The results are written to a JSON file, which can be used as baseline of later runs.
+Fails (exit code 1) if throughput or peak RSS regress by more than the threshold compared to the baseline.
+
+    $ python benchmarks/bench_campaign.py [--stations 4] [--intervals 2] [--interval 1D] [--duration 2h] \\
+        [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from pyrnet import synthetic
+
+CLI = [sys.executable, "-c", "from pyrnet.click import cli; cli()"]
+
+# metrics compared to the baseline, True if larger is better
+METRICS = {
+    "files_per_second": True,
+    "mb_per_second": True,
+    "peak_rss_bytes": False,
+}
+
+
+def write_survey(fname, stations, dates):
+    """ LimeSurvey responses with one maintenance report per station and date.
+    """
+    columns = [
+        "id", "submitdate", "lastpage", "startlanguage", "seed", "startdate", "datestamp",
+        "Q00", "Q01", "MainQ01", "MainQ01[comment]", "MainQ02", "MainQ02[comment]",
+        "ExtraQ01", "ExtraQ01[comment]", "ExtraQ02", "ExtraQ02[comment]", "interviewtime",
+    ]
+    with open(fname, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL)
+        writer.writerow(columns)
+        i = 0
+        for date in dates:
+            stamp = pd.to_datetime(date).strftime("%Y-%m-%d %H:%M:%S")
+            for st in stations:
+                i += 1
+                writer.writerow([
+                    i, stamp, 1, "en", i, stamp, stamp,
+                    st, "synthetic", "AO01", "", "AO01", "", "AO01", "", "AO01", "", 60.,
+                ])
+
+
+def build_campaign(workdir, stations, intervals, interval, duration, start):
+    """ Raw logger files and maintenance report of a fake campaign.
+    Each raw file stores *duration* of data at the start of a maintenance interval.
+    """
+    raw = os.path.join(workdir, "raw")
+    os.makedirs(raw)
+    interval = pd.to_timedelta(interval).to_timedelta64()
+    fnames = []
+    for st in stations:
+        for j in range(intervals):
+            fname = os.path.join(raw, f"Pyr{st}_{j:03d}.bin")
+            synthetic.write_logger_file(fname, start + j * interval, duration, box=st, seed=st * 1000 + j)
+            fnames.append(fname)
+    survey = os.path.join(workdir, "survey.csv")
+    write_survey(survey, stations, [start + (j + 1) * interval for j in range(intervals)])
+    return fnames, survey
+
+
+def run(args, workdir):
+    """ Run a CLI command in *workdir*, return wall time and peak RSS of the process.
+    """
+    t0 = time.perf_counter()
+    p = subprocess.Popen(CLI + args, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(p.pid, 0)
+    wall = time.perf_counter() - t0
+    p.returncode = os.waitstatus_to_exitcode(status)
+    if p.returncode != 0:
+        raise RuntimeError(f"pyrnet {' '.join(args)} failed with exit code {p.returncode}.")
+    # ru_maxrss is in kilobytes on linux
+    return wall, rusage.ru_maxrss * 1024
+
+
+def stage_times(stats_file):
+    """ Total wall time per processing stage from the --stats JSON lines file.
+    """
+    stages = defaultdict(float)
+    if not os.path.exists(stats_file):
+        return {}
+    with open(stats_file) as f:
+        for line in f:
+            rec = json.loads(line)
+            stages[rec["stage"]] += rec["wall_s"]
+    return dict(stages)
+
+
+def bench_command(name, calls, workdir):
+    """ Run *calls* (list of (args, input_files)) of one command and summarize.
+    """
+    stats_file = os.path.join(workdir, f"stats_{name}.jsonl")
+    wall, rss, nfiles, nbytes = 0., 0, 0, 0
+    for args, input_files in calls:
+        t, r = run(args + ["--stats", stats_file], workdir)
+        wall += t
+        rss = max(rss, r)
+        nfiles += len(input_files)
+        nbytes += sum(os.path.getsize(fn) for fn in input_files)
+    return {
+        "calls": len(calls),
+        "files": nfiles,
+        "bytes": nbytes,
+        "seconds": wall,
+        "files_per_second": nfiles / wall,
+        "mb_per_second": nbytes / 1e6 / wall,
+        "peak_rss_bytes": rss,
+        "stages": stage_times(stats_file),
+    }
+
+
+def compare(results, baseline, threshold):
+    """ Print comparison to baseline, returns True if a metric regressed.
+    """
+    regressed = False
+    for name, res in results["commands"].items():
+        if name not in baseline["commands"]:
+            continue
+        base = baseline["commands"][name]
+        for metric, larger_is_better in METRICS.items():
+            ratio = res[metric] / base[metric]
+            bad = ratio < 1 - threshold if larger_is_better else ratio > 1 + threshold
+            regressed |= bad
+            print(f"{name:6s} {metric:18s}: {ratio:6.2f}x baseline{'  <- regression' if bad else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=4, help="Number of stations. The default is 4.")
+    parser.add_argument("--intervals", type=int, default=2, help="Number of maintenance intervals. The default is 2.")
+    parser.add_argument("--interval", default="1D", help="Length of a maintenance interval. The default is 1D.")
+    parser.add_argument("--duration", default="2h",
+                        help="Duration of data recorded in each raw file. The default is 2h.")
+    parser.add_argument("--start", default="2023-06-01T00:00", help="Start of the campaign. The default is 2023-06-01T00:00.")
+    parser.add_argument("--workdir", default=None,
+                        help="Run in this (new) directory and keep it. By default a temporary directory is used.")
+    parser.add_argument("--output", default=None, help="Write results to this json file.")
+    parser.add_argument("--baseline", default=None, help="Compare results to this json file of a previous run.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative regression compared to the baseline. The default is 0.2.")
+    args = parser.parse_args()
+
+    stations = list(range(1, args.stations + 1))
+    start = np.datetime64(args.start, "ms")
+
+    tmpdir = None
+    if args.workdir is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        workdir = tmpdir.name
+    else:
+        workdir = os.path.abspath(args.workdir)
+        os.makedirs(workdir)
+
+    try:
+        t0 = time.perf_counter()
+        raw_files, survey = build_campaign(workdir, stations, args.intervals, args.interval, args.duration, start)
+        print(f"generated {len(raw_files)} raw files in {time.perf_counter() - t0:.1f}s")
+        for lvl in ["l1a", "l1b", "l1b_network"]:
+            os.makedirs(os.path.join(workdir, lvl))
+
+        commands = {}
+        commands["l1a"] = bench_command("l1a", [
+            (["process", "l1a", *raw_files, "l1a", "--report", survey], raw_files),
+        ], workdir)
+        l1a_files = sorted(glob.glob(os.path.join(workdir, "l1a", "*.nc")))
+        commands["l1b"] = bench_command("l1b", [
+            (["process", "l1b", *l1a_files, "l1b"], l1a_files),
+        ], workdir)
+        l1b_files = sorted(glob.glob(os.path.join(workdir, "l1b", "*.nc")))
+        by_day = defaultdict(list)
+        for fn in l1b_files:
+            by_day[os.path.basename(fn).split("_")[1]].append(fn)
+        commands["merge"] = bench_command("merge", [
+            (["merge", *fnames, os.path.join("l1b_network", f"{day}.nc")], fnames)
+            for day, fnames in sorted(by_day.items())
+        ], workdir)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    results = {
+        "campaign": {"stations": args.stations, "intervals": args.intervals, "interval": args.interval,
+                     "duration": args.duration},
+        "commands": commands,
+    }
+    for name, res in commands.items():
+        print(f"{name:6s}: {res['files']:4d} files {res['seconds']:8.2f}s {res['files_per_second']:8.3f} files/s"
+              f" {res['mb_per_second']:8.3f} MB/s {res['peak_rss_bytes']/2**20:8.1f} MiB peak RSS")
+        for stage, t in sorted(res["stages"].items(), key=lambda x: -x[1]):
+            print(f"    {stage:20s}: {t:8.2f}s")
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
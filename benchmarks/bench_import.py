@@ -0,0 +1,74 @@
+"""
+Import time benchmark of the pyrnet command line interface.
+
+Each measurement runs in a fresh interpreter, the minimum over all repetitions is reported.
+Fails (exit code 1) if the startup exceeds the threshold, or if heavy dependencies
+are imported by the CLI module.
+
+    $ python benchmarks/bench_import.py [--repeat 10] [--max-seconds 0.5]
+"""
+import sys
+import time
+import argparse
+import subprocess
+
+# modules which must not be loaded to show the CLI help
+HEAVY_MODULES = [
+    "numpy", "pandas", "xarray", "scipy", "pyproj", "trosat",
+    "jstyleson", "pkg_resources", "netCDF4",
+]
+
+CASES = {
+    "import pyrnet.click": "import pyrnet.click",
+    "pyrnet --help": "from pyrnet.click import cli; cli(['--help'], standalone_mode=False)",
+}
+
+
+def timeit(code, repeat):
+    """ Minimum wall time of running *code* in a new interpreter.
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def heavy_imports():
+    """ Heavy modules loaded by importing the CLI module.
+    """
+    code = (
+        "import sys, pyrnet.click;"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    res = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return res.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Number of repetitions. The default is 10.")
+    parser.add_argument("--max-seconds", type=float, default=0.5,
+                        help="Maximum allowed startup time in seconds. The default is 0.5.")
+    args = parser.parse_args()
+
+    baseline = timeit("pass", args.repeat)
+    print(f"{'python startup':24s}: {baseline:.3f}s")
+    failed = False
+    for name, code in CASES.items():
+        t = timeit(code, args.repeat)
+        print(f"{name:24s}: {t:.3f}s (+{t - baseline:.3f}s)")
+        if t > args.max_seconds:
+            print(f"  -> exceeds {args.max_seconds:.3f}s")
+            failed = True
+
+    heavy = heavy_imports()
+    if len(heavy) > 0:
+        print(f"heavy modules imported by the CLI: {', '.join(heavy)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Benchmark of the raw logger file processing in pyrnet.logger.
+
+Synthetic logger files (pyrnet.synthetic) of increasing duration are generated and processed
+by the steps of the level l1a/l1b processing. For each step the throughput in ADC samples per
+second (minimum wall time over all repetitions) and the peak memory allocated (tracemalloc)
+is reported.
+
+    $ python benchmarks/bench_logger.py [--durations 10min 1h 1D 30D] [--gzip] [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import xarray as xr
+
+from pyrnet import logger as pyrlogger
+from pyrnet import synthetic
+
+
+def measure(func, repeat):
+    """ Minimum wall time and peak traced memory of calling *func*.
+    Returns the result of the last call.
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = func()
+        times.append(time.perf_counter() - t0)
+    # separate run for memory, tracing slows down the pure python parts
+    tracemalloc.start()
+    res = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return res, min(times), peak
+
+
+def bench(fname, repeat):
+    """ Run all steps on the logger file *fname*.
+    """
+    results = {}
+
+    def run(name, func):
+        res, t, peak = measure(func, repeat)
+        results[name] = {"seconds": t, "peak_mem_bytes": peak}
+        return res
+
+    rec_adc, rec_gprmc = run("read_records", lambda: pyrlogger.read_records(fname))
+    adctime = run("get_adc_time", lambda: pyrlogger.get_adc_time(rec_adc))
+    adctime = run("sync_adc_time", lambda: pyrlogger.sync_adc_time(adctime, rec_gprmc.time, rec_gprmc.iadc))
+    run("adc_binning", lambda: pyrlogger.adc_binning(rec_adc, adctime))
+    volts = 3.3 * rec_adc[:, 2:] / 1023.
+    ds = xr.Dataset(
+        data_vars={
+            "ghi": (("time", "station"), volts[:, 2:3] / 300.),
+            "ta": ("time", 253.15 + 40. * volts[:, 0]),
+        },
+        coords={"time": ("time", adctime)},
+    )
+    run("resample_mean", lambda: pyrlogger.resample_mean(ds, freq="1s"))
+    run("interpolate_coords", lambda: pyrlogger.interpolate_coords(rec_gprmc, adctime))
+    return rec_adc.shape[0], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", nargs="+", default=["10min", "1h", "1D"],
+                        help="Durations of the synthetic files, e.g. '10min', '1D', '30D'. The default is 10min 1h 1D.")
+    parser.add_argument("--rate", type=int, default=10, help="ADC sample rate [Hz]. The default is 10.")
+    parser.add_argument("--gzip", action="store_true", help="Gzip compress the synthetic files.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions. The default is 3.")
+    parser.add_argument("--json", default=None, help="Write results to this json file.")
+    args = parser.parse_args()
+
+    output = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for duration in args.durations:
+            fname = os.path.join(tmpdir, "Pyr1_000.bin" + (".gz" if args.gzip else ""))
+            t0 = time.perf_counter()
+            stats = synthetic.write_logger_file(fname, np.datetime64("2023-06-01"), duration,
+                                                rate=args.rate, drift=1.)
+            print(f"--- {duration}: {stats['samples']} samples, {os.path.getsize(fname)/1e6:.1f} MB"
+                  f" (generated in {time.perf_counter() - t0:.1f}s)")
+            samples, results = bench(fname, args.repeat)
+            for name, res in results.items():
+                res["samples_per_second"] = samples / res["seconds"]
+                print(f"{name:20s}: {res['seconds']:9.4f}s {res['samples_per_second']:12.3e} samples/s"
+                      f" {res['peak_mem_bytes']/2**20:9.1f} MiB")
+            output.append({"duration": duration, "rate": args.rate, "gzip": args.gzip,
+                           "samples": samples, "steps": results})
+            os.remove(fname)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/cache.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'CACHE_CONFIG', 'configure', 'cache_key', 'cache_size', 'evict', 'clear', 'urlread', 'open_dataset']
+
+# %% ../../nbs/pyrnet/cache.ipynb 2
+import os
+import time
+import json
+import hashlib
+import logging
+import warnings
+from urllib.request import urlopen
+import xarray as xr
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/cache.ipynb 5
+CACHE_CONFIG = {
+    "enabled": os.environ.get("PYRNET_CACHE", "1") != "0", # use the cache
+    "cache_dir": os.environ.get("PYRNET_CACHE_DIR",
+                                os.path.join(os.path.expanduser("~"), ".cache", "pyrnet")),
+    "max_size": int(float(os.environ.get("PYRNET_CACHE_SIZE", 5e9))), # maximum size of the cache in bytes
+    "offline": os.environ.get("PYRNET_OFFLINE", "0") == "1", # serve from cache only
+    "catalog_max_age": 86400, # seconds until a cached catalog is requested again
+}
+
+def configure(**kwargs) -> dict:
+    """
+    Update the cache configuration.
+
+    Parameters
+    ----------
+    kwargs:
+        Any of 'enabled', 'cache_dir', 'max_size', 'offline', 'catalog_max_age'.
+        None values are ignored.
+
+    Returns
+    -------
+    dict
+        The updated cache configuration.
+    """
+    unknown = set(kwargs) - set(CACHE_CONFIG)
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown cache configuration {unknown}.")
+    CACHE_CONFIG.update({k: v for k, v in kwargs.items() if v is not None})
+    return CACHE_CONFIG
+
+# %% ../../nbs/pyrnet/cache.ipynb 7
+_cache_sfx = (".nc", ".raw")
+
+def cache_key(url: str, **subset) -> str:
+    """ Hash of url and subset description used as cache file name.
+    """
+    key = json.dumps({"url": url, **subset}, sort_keys=True, default=str)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def _cache_path(key, sfx):
+    return os.path.join(CACHE_CONFIG["cache_dir"], key + sfx)
+
+def _cache_files():
+    """ List of (path, size, last access) of all cached files.
+    """
+    if not os.path.isdir(CACHE_CONFIG["cache_dir"]):
+        return []
+    files = []
+    with os.scandir(CACHE_CONFIG["cache_dir"]) as it:
+        for entry in it:
+            if not entry.name.endswith(_cache_sfx):
+                continue
+            stat = entry.stat()
+            files.append((entry.path, stat.st_size, stat.st_atime))
+    return files
+
+def _touch(fname):
+    """ Set the last access of a cache file to now, keeping the fetch time (modification time).
+    """
+    os.utime(fname, (time.time(), os.path.getmtime(fname)))
+
+def _write_atomic(fname, write):
+    """ Write via temporary file, to never leave incomplete files in the cache.
+    """
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    tmp = f"{fname}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, fname)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def cache_size() -> int:
+    """ Total size of the cache in bytes.
+    """
+    return sum(size for _, size, _ in _cache_files())
+
+def evict(max_size: int|None = None, keep: str|None = None) -> list[str]:
+    """
+    Remove least recently used files until the cache is smaller than *max_size*.
+
+    Parameters
+    ----------
+    max_size: int or None
+        Maximum size of the cache in bytes. If None, CACHE_CONFIG['max_size'] is used.
+    keep: str or None
+        Path of a cache file which is never evicted, e.g., the file just written.
+
+    Returns
+    -------
+    list of str
+        Paths of the removed files.
+    """
+    if max_size is None:
+        max_size = CACHE_CONFIG["max_size"]
+    files = sorted(_cache_files(), key=lambda f: f[2])
+    total = sum(f[1] for f in files)
+    removed = []
+    for path, size, _ in files:
+        if total <= max_size:
+            break
+        if path == keep:
+            continue
+        os.remove(path)
+        total -= size
+        removed.append(path)
+        logger.debug(f"Evicted {path} from cache.")
+    return removed
+
+def clear():
+    """ Remove all files from the cache.
+    """
+    return evict(max_size=0)
+
+# %% ../../nbs/pyrnet/cache.ipynb 9
+def urlread(url: str, max_age: float|None = None) -> bytes:
+    """
+    Read the content of an url via the local cache.
+
+    Parameters
+    ----------
+    url: str
+        Url of the requested resource.
+    max_age: float or None
+        Maximum age of the cached content in seconds. If None, CACHE_CONFIG['catalog_max_age'] is used.
+
+    Returns
+    -------
+    bytes
+        Content of the requested resource.
+    """
+    if not CACHE_CONFIG["enabled"]:
+        with urlopen(url) as f:
+            return f.read()
+    if max_age is None:
+        max_age = CACHE_CONFIG["catalog_max_age"]
+
+    fname = _cache_path(cache_key(url), ".raw")
+    cached = os.path.exists(fname)
+    if cached and (CACHE_CONFIG["offline"] or (time.time() - os.path.getmtime(fname)) < max_age):
+        logger.debug(f"Read {url} from cache.")
+        _touch(fname)
+        with open(fname, "rb") as f:
+            return f.read()
+    if CACHE_CONFIG["offline"]:
+        raise FileNotFoundError(f"{url} is not cached, but cache is in offline mode.")
+
+    try:
+        with urlopen(url) as f:
+            content = f.read()
+    except OSError as e:
+        if not cached:
+            raise
+        warnings.warn(f"Failed to request {url} ({e}), use outdated cache.")
+        _touch(fname)
+        with open(fname, "rb") as f:
+            return f.read()
+
+    def _write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(content)
+    _write_atomic(fname, _write)
+    evict(keep=fname)
+    return content
+
+def open_dataset(url: str, *, drop_vars: list[str]|None = None, **kwargs) -> xr.Dataset:
+    """
+    Open a (remote) dataset via the local cache.
+
+    Parameters
+    ----------
+    url: str
+        OPeNDAP url or path of the dataset.
+    drop_vars: list of str or None
+        Variables which are not requested. Part of the cache key.
+    kwargs:
+        Passed to xarray.open_dataset, e.g., mask_and_scale.
+
+    Returns
+    -------
+    xarray.Dataset
+    """
+    if drop_vars is not None:
+        drop_vars = sorted(drop_vars)
+    if not CACHE_CONFIG["enabled"]:
+        return xr.open_dataset(url, drop_variables=drop_vars, **kwargs)
+
+    fname = _cache_path(cache_key(url, drop_vars=drop_vars), ".nc")
+    if os.path.exists(fname):
+        logger.debug(f"Read {url} from cache.")
+        _touch(fname)
+    elif CACHE_CONFIG["offline"]:
+        raise FileNotFoundError(f"{url} is not cached, but cache is in offline mode.")
+    else:
+        logger.info(f"Fetch {url} to cache.")
+        # fetch undecoded, to keep the raw values and encoding attributes
+        with xr.open_dataset(url, drop_variables=drop_vars, decode_cf=False) as ds:
+            ds = ds.load()
+        _write_atomic(fname, ds.to_netcdf)
+        evict(keep=fname)
+    return xr.open_dataset(fname, **kwargs)
@@ -0,0 +1,189 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/catalog.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'index_archive', 'lookup_fnames']
+
+# %% ../../nbs/pyrnet/catalog.ipynb 2
+import os
+import sqlite3
+import logging
+from contextlib import closing
+import parse
+import numpy as np
+import pandas as pd
+
+from . import utils as pyrutils
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/catalog.ipynb 5
+_catalog_schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    lvl TEXT,
+    campaign TEXT,
+    station INTEGER,
+    collection INTEGER,
+    startdt TEXT,
+    enddt TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_lookup ON files (lvl, campaign, station, startdt, enddt);
+"""
+_catalog_levels = ["l1a", "l1b", "l1b_network"]
+# additional file name templates of a level
+_catalog_templates = {"l1a_segment": "l1a", "l1b_pyramid": "l1b_pyramid", "l1b_pyramid_network": "l1b_pyramid_network"}
+
+def _fname_templates(config=None):
+    """ File name templates (level, template), prepared for parsing.
+    """
+    if config is None:
+        fn = pyrutils.resource_filename("share/pyrnet_config.json")
+        config = pyrutils.read_json(fn)
+    templates = [(lvl, config[f"output_{lvl}"]) for lvl in _catalog_levels]
+    templates += [(lvl, config[f"output_{key}"]) for key, lvl in _catalog_templates.items() if f"output_{key}" in config]
+    return [(lvl, template.replace(":%Y-%m-%d}", ":ti}")) for lvl, template in templates]
+
+def _parse_fname(fname, templates):
+    """ Parse file name to catalog entry, returns None if no template matches.
+    """
+    for lvl, template in templates:
+        res = parse.parse(template, fname)
+        if res is None:
+            continue
+        res = res.named
+        if "dt" in res:
+            startdt, enddt = res["dt"], res["dt"]
+        else:
+            startdt, enddt = res["startdt"], res["enddt"]
+        return dict(
+            lvl=lvl,
+            campaign=res["campaign"],
+            station=res.get("station", None),
+            collection=res["collection"],
+            startdt=pd.to_datetime(startdt).strftime("%Y-%m-%dT%H:%M:%S"),
+            enddt=pd.to_datetime(enddt).strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+    return None
+
+def index_archive(root: str, db: str, *, config: dict|None = None) -> dict:
+    """
+    Index (or update the index of) a local archive of PyrNet files into a SQLite database.
+
+    Parameters
+    ----------
+    root: str
+        Root directory of the archive, searched recursively.
+    db: str
+        Path of the SQLite database file. Created if it not exists.
+    config: dict or None
+        Config providing the file name templates 'output_l1a', 'output_l1b' and 'output_l1b_network'.
+        If None, the templates of the default config are used.
+
+    Returns
+    -------
+    dict
+        Number of 'added', 'updated' and 'removed' files.
+    """
+    templates = _fname_templates(config)
+    root = os.path.abspath(root)
+    stats = {"added": 0, "updated": 0, "removed": 0}
+    with closing(sqlite3.connect(db)) as con, con:
+        con.executescript(_catalog_schema)
+        indexed = {
+            path: (mtime, size) for path, mtime, size in
+            # paths below root as range of the path index, '_' and '%' of the root would be wildcards of LIKE
+            con.execute("SELECT path, mtime, size FROM files WHERE path >= ? AND path < ?",
+                        (root + os.sep, root + chr(ord(os.sep) + 1)))
+        }
+        rows = []
+        for dirpath, _, fnames in os.walk(root):
+            for fname in fnames:
+                path = os.path.join(dirpath, fname)
+                stat = os.stat(path)
+                known = indexed.pop(path, None)
+                if known == (stat.st_mtime, stat.st_size):
+                    continue
+                entry = _parse_fname(fname, templates)
+                if entry is None:
+                    continue
+                stats["added" if known is None else "updated"] += 1
+                rows.append((path, stat.st_mtime, stat.st_size, entry["lvl"], entry["campaign"],
+                             entry["station"], entry["collection"], entry["startdt"], entry["enddt"]))
+        con.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        # files which do not exist anymore
+        con.executemany("DELETE FROM files WHERE path=?", [(path,) for path in indexed])
+        stats["removed"] = len(indexed)
+    logger.info(f"Indexed {root} to {db}: {stats}")
+    return stats
+
+# %% ../../nbs/pyrnet/catalog.ipynb 7
+def lookup_fnames(db: str, date, *, station, lvl, campaign, collection) -> list[str]:
+    """
+    Query the local catalog and return list of file paths matching the date, station, campaign and collection configuration.
+
+    Parameters
+    ----------
+    db: str
+        Path of the SQLite database generated by `index_archive`.
+    date: float, datetime or datetime64
+        A representation of time. If float, interpreted as Julian date.
+    station: list, ndarray, scalar of type int or None
+        PyrNet station numbers. If None, the network file or all stations available are looked up.
+    lvl: str
+        Data processing level -> 'l1a', 'l1b'.
+    campaign: str
+        Campaign identifier.
+    collection: int or None
+        Collection number. If None, the latest available collection is looked up.
+
+    Returns
+    -------
+    list of str
+        Paths of the matching files.
+    """
+    date = pyrutils.to_datetime64(date)
+    day = np.datetime_as_string(date.astype("datetime64[D]"), unit='s')
+    date = np.datetime_as_string(date, unit='s')
+
+    with closing(sqlite3.connect(db)) as con:
+        if station is None:
+            nlvl = f"{lvl}_network"
+            query = "SELECT path, collection FROM files WHERE lvl=? AND campaign=? AND startdt=?"
+            args = [nlvl, campaign, day]
+            if collection is not None:
+                query += " AND collection=?"
+                args.append(int(collection))
+            res = con.execute(query + " ORDER BY collection DESC LIMIT 1", args).fetchall()
+            if len(res) > 0:
+                return [res[0][0]]
+            station = [st for st, in con.execute(
+                "SELECT DISTINCT station FROM files WHERE lvl=? AND campaign=? ORDER BY station",
+                (lvl, campaign))]
+
+        station = np.atleast_1d(station)
+
+        fnames = []
+        for st in station:
+            st = int(st)
+            if collection is None:
+                col, = con.execute(
+                    "SELECT MAX(collection) FROM files WHERE lvl=? AND campaign=? AND station=?",
+                    (lvl, campaign, st)).fetchone()
+                if col is None:
+                    logger.warning(f"File of station {st} does not exist.")
+                    continue
+            else:
+                col = int(collection)
+
+            res = con.execute(
+                "SELECT path FROM files WHERE lvl=? AND campaign=? AND station=? AND collection=? "
+                "AND startdt<=? AND enddt>=? ORDER BY startdt DESC",
+                (lvl, campaign, st, col, date if lvl == 'l1a' else day, date if lvl == 'l1a' else day)
+            ).fetchall()
+            if len(res) == 0:
+                logger.warning(f"File of station {st}, collection {col}, level {lvl} at date {date} does not exist.")
+                continue
+            fnames.extend([path for path, in res])
+    return fnames
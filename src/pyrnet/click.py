@@ -2,36 +2,102 @@ import re
 import os.path
 
 import click
-import numpy as np
-import pandas as pd
-import xarray as xr
 import logging
-from collections.abc import Iterable
-from toolz import merge_with, assoc_in
-
-from . import pyrnet
-from . import data as pyrdata
-from . import utils as pyrutils
-from . import reports as pyrreports
-
-
-# logging setup
-logging.basicConfig(
-    filename='pyrnet.log',
-    encoding='utf-8',
-    level=logging.DEBUG,
-    format='%(asctime)s %(name)s %(levelname)s:%(message)s'
-)
+from contextlib import contextmanager, nullcontext
+
+# The processing modules and their dependencies (numpy, pandas, xarray, scipy, ...)
+# are imported inside of the commands, to keep the startup of the CLI fast.
+
 logger = logging.getLogger(__name__)
 
 @click.group("pyrnet")
 def cli():
-    pass
+    # logging setup
+    logging.basicConfig(
+        filename='pyrnet.log',
+        encoding='utf-8',
+        level=logging.DEBUG,
+        format='%(asctime)s %(name)s %(levelname)s:%(message)s'
+    )
+
+@contextmanager
+def _record_stats(stats_file, **info):
+    """ Record processing stage statistics to JSON lines file *stats_file*, if given.
+    """
+    if stats_file is None:
+        yield
+        return
+    from . import instrument as pyrinst
+    with pyrinst.record() as stats:
+        try:
+            yield
+        finally:
+            pyrinst.write_jsonl(stats, stats_file, **info)
 
 @click.group("process")
 def process():
     print("Process")
 
+def _process_l1a(fnames, output_path, stationid, cfg, report, split, stats):
+    """ Process raw files of one station to l1a files, in a worker process with --jobs.
+    Returns list of (input file, [(l1a file, date of maintenance), ...]).
+    """
+    import numpy as np
+    import pandas as pd
+    from . import data as pyrdata
+    from . import logger as pyrlogger
+
+    results = []
+    for fn in fnames:
+        filename = os.path.basename(fn)
+        outputs = []
+        with _record_stats(stats, command="l1a", input=filename):
+            logging.info(f"start raw->l1a: {filename}")
+            logging.info(f"found station number {stationid}")
+
+            template = cfg['output_l1a']
+            segments = [None]
+            if split:
+                segments = pyrlogger.read_segments(fn, date_of_measure=np.datetime64(cfg['date_of_measure']))
+                if len(segments) > 1:
+                    # several l1a files of the same day
+                    template = cfg['output_l1a_segment']
+                    logging.info(f"split {filename} into {len(segments)} segments")
+
+            for records in segments:
+                ds = pyrdata.to_l1a(
+                    fname=fn,
+                    station=stationid,
+                    date_of_measure=np.datetime64(cfg['date_of_measure']),
+                    report=report,
+                    config=cfg,
+                    global_attrs=cfg['global_attrs'],
+                    records=records
+                )
+                if ds is None:
+                    logging.warning(f"Skip {filename}.")
+                    continue
+
+                outfile = os.path.join(output_path, template)
+                outfile = outfile.format_map(
+                    dict(
+                        startdt=pd.to_datetime(ds.gpstime.values[0]),
+                        enddt=pd.to_datetime(ds.gpstime.values[-1]),
+                        campaign=cfg['campaign'],
+                        station=stationid,
+                        collection=cfg['collection'],
+                        sfx="nc"
+                    )
+                )
+                # if os.path.exists(outfile):
+                    # logger.info(f"{outfile} already exists, write to ")
+                pyrdata.to_netcdf(ds, outfile, timevar="gpstime")
+                # ds.to_netcdf(outfile, encoding={'gpstime':{'dtype':'float64'}})
+                logging.info(f"l1a saved to {outfile}")
+                outputs.append((outfile, ds.gpstime.values[-1]))
+        results.append((fn, outputs))
+    return results
+
 @click.command("l1a")
 @click.argument("input_files", nargs=-1)
 @click.argument("output_path", nargs=1)
@@ -42,11 +108,33 @@ def process():
               help="Specify the maintenance report file. If empty or 'online' it attempts to request it online.")
 @click.option("--date_of_maintenance",
               help="Specify date of maintenance as datetime64 string ('YYYY-MM-DD'). If not specified, try to retrieve from data.")
+@click.option("--stats",
+              help="Append wall time, CPU time and peak memory of the processing stages as JSON lines to this file.")
+@click.option("--incremental", is_flag=True,
+              help="Skip input files, whose outputs recorded in the manifest of OUTPUT_PATH are up-to-date, and record the outputs in the manifest.")
+@click.option("--split", is_flag=True,
+              help="Split input files at logger restarts and write a l1a file for each segment.")
+@click.option("--jobs", "-j", type=int, default=1,
+              help="Number of worker processes. Files of the same station are processed by the same worker. The default is 1.")
+@click.option("--dedup",
+              help="Deduplication index (SQLite). Skip input files, which are contained in other input files (see 'pyrnet dedup').")
 def process_l1a(input_files,
                 output_path,
                 config,
                 report,
-                date_of_maintenance):
+                date_of_maintenance,
+                stats,
+                incremental,
+                split,
+                jobs,
+                dedup):
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from . import data as pyrdata
+    from . import utils as pyrutils
+    from . import reports as pyrreports
+    from . import manifest as pyrmanifest
+
     if config is not None:
         config = pyrutils.read_json(config)
     cfg = pyrdata.get_config(config)
@@ -63,53 +151,88 @@ def process_l1a(input_files,
         df_report = pyrreports.get_responses(fn=report)
 
     if date_of_maintenance is None:
-        report = df_report
+        # index once, the report is parsed for each file
+        report = None if df_report is None else pyrreports.index_report(df_report)
     else:
         report = pyrreports.parse_report(df_report,
                                   date_of_maintenance=np.datetime64(date_of_maintenance))
 
-    with click.progressbar(input_files,label='Processing') as files:
-        for fn in files:
-            filepath = os.path.abspath(fn)
-            filename = os.path.basename(filepath)
-            logging.info(f"start raw->l1a: {filename}")
-
-            m = parse.match(filename)
-            try:
-                stationid = int(m.group('ID'))
-            except:
-                raise ValueError(f"Could not find station id in filename {filename} using regex {config['filename_parser']}.")
-            logging.info(f"found station number {stationid}")
-
-            ds = pyrdata.to_l1a(
-                fname=fn,
-                station=stationid,
-                date_of_measure=np.datetime64(cfg['date_of_measure']),
-                report=report,
-                config=cfg,
-                global_attrs=cfg['global_attrs']
-            )
-            if ds is None:
-                logging.warning(f"Skip {filename}.")
-                continue
-
-            outfile = os.path.join(output_path, cfg['output_l1a'])
-            outfile = outfile.format_map(
-                dict(
-                    startdt=pd.to_datetime(ds.gpstime.values[0]),
-                    enddt=pd.to_datetime(ds.gpstime.values[-1]),
-                    campaign=cfg['campaign'],
-                    station=stationid,
-                    collection=cfg['collection'],
-                    sfx="nc"
-                )
+    # the manifest is only used with --incremental, it hashes all input files
+    manifest = pyrmanifest.read_manifest(output_path) if incremental else None
+    def dependencies(station, date):
+        return pyrmanifest.l1a_dependencies(cfg, station, date, report=report)
+
+    redundant = []
+    if dedup is not None:
+        from . import dedup as pyrdedup
+        # ADC blocks are only compared, if indexed before
+        pyrdedup.index_files(input_files, dedup)
+        redundant = pyrdedup.redundant_files(pyrdedup.find_duplicates(input_files, dedup), input_files)
+
+    # input files by station
+    stations, station_of = {}, {}
+    for fn in input_files:
+        filepath = os.path.abspath(fn)
+        filename = os.path.basename(filepath)
+        if filepath in redundant:
+            logging.info(f"Skip {filename}, it is contained in another input file.")
+            continue
+        if incremental and pyrmanifest.is_up_to_date(manifest, output_path, filepath, dependencies):
+            logging.info(f"Skip {filename}, outputs are up-to-date.")
+            continue
+        m = parse.match(filename)
+        try:
+            stationid = int(m.group('ID'))
+        except:
+            raise ValueError(f"Could not find station id in filename {filename} using regex {config['filename_parser']}.")
+        stations.setdefault(stationid, []).append(filepath)
+        station_of[filepath] = stationid
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()
+    with pool:
+        if jobs > 1:
+            futures = [
+                pool.submit(_process_l1a, fnames, output_path, stationid, cfg, report, split, stats)
+                for stationid, fnames in stations.items()
+            ]
+            results = (res for future in as_completed(futures) for res in future.result())
+        else:
+            results = (
+                res
+                for stationid, fnames in stations.items()
+                for fn in fnames
+                for res in _process_l1a([fn], output_path, stationid, cfg, report, split, stats)
             )
-            # if os.path.exists(outfile):
-                # logger.info(f"{outfile} already exists, write to ")
-            pyrdata.to_netcdf(ds, outfile, timevar="gpstime")
-            # ds.to_netcdf(outfile, encoding={'gpstime':{'dtype':'float64'}})
-            logging.info(f"l1a saved to {outfile}")
 
+        nfiles = sum(len(fnames) for fnames in stations.values())
+        with click.progressbar(results, length=nfiles, label='Processing') as files:
+            for filepath, outputs in files:
+                if not incremental:
+                    continue
+                stationid = station_of[filepath]
+                for outfile, date in outputs:
+                    manifest = pyrmanifest.record_output(
+                        manifest, outfile,
+                        inputs=[filepath],
+                        dependencies=dependencies(stationid, date),
+                        station=stationid,
+                        date=date,
+                    )
+                pyrmanifest.write_manifest(output_path, manifest)
+
+
+def _process_l1b(filepath, config, cfg, stats):
+    """ Process l1a file to l1b, in a worker process with --jobs.
+    """
+    from . import data as pyrdata
+    filename = os.path.basename(filepath)
+    with _record_stats(stats, command="l1b", input=filename):
+        logging.info(f"start l1a->l1b: {filename}")
+        return pyrdata.to_l1b(
+            filepath,
+            config=config,
+            global_attrs=cfg['global_attrs']
+        )
 
 @click.command("l1b")
 @click.argument("input_files", nargs=-1)
@@ -117,47 +240,99 @@ def process_l1a(input_files,
 @click.option("--config","-c",
               nargs=1,
               help="Specify config files with override the default config.")
+@click.option("--stats",
+              help="Append wall time, CPU time and peak memory of the processing stages as JSON lines to this file.")
+@click.option("--incremental", is_flag=True,
+              help="Skip input files, whose outputs recorded in the manifest of OUTPUT_PATH are up-to-date, and record the outputs in the manifest.")
+@click.option("--jobs", "-j", type=int, default=1,
+              help="Number of worker processes for the l1b processing of the input files. The default is 1.")
+@click.option("--quicklook",
+              help="Update the quicklook tiles of this SQLite database with the l1b files.")
 def process_l1b(input_files: list[str],
                 output_path: str,
-                config:str):
+                config:str,
+                stats:str|None,
+                incremental:bool,
+                jobs:int,
+                quicklook:str|None):
+    import numpy as np
+    import pandas as pd
+    import xarray as xr
+    from functools import partial
+    from concurrent.futures import ProcessPoolExecutor
+    from . import data as pyrdata
+    from . import utils as pyrutils
+    from . import manifest as pyrmanifest
+    from . import quicklook as pyrquicklook
 
     if config is not None:
         config = pyrutils.read_json(config)
     cfg = pyrdata.get_config(config)
 
-    with click.progressbar(input_files,label='Processing') as files:
-        for fn in files:
-            filepath = os.path.abspath(fn)
-            filename = os.path.basename(filepath)
-            logging.info(f"start l1a->l1b: {filename}")
-
-            ds = pyrdata.to_l1b(
-                filepath,
-                config=config,
-                global_attrs=cfg['global_attrs']
-            )
-            if ds is None:
-                logger.debug(f"{filename} is skipped.")
-                continue
-
-            box = int(ds.station.values[0])
-            udays = np.unique(ds.time.values.astype("datetime64[D]"))
-            for day in udays:
-                day = pd.to_datetime(day)
-                logging.info(f"process day {day:%Y-%m-%d}")
-                dsd = ds.sel(time=f"{day:%Y-%m-%d}")
-                outfile = os.path.join(output_path, cfg['output_l1b'])
-                outfile = outfile.format_map(
-                    dict(
-                        dt=day,
-                        campaign=cfg['campaign'],
+    # the manifest is only used with --incremental, it hashes all input files
+    manifest = pyrmanifest.read_manifest(output_path) if incremental else None
+    def dependencies(station, date):
+        return pyrmanifest.l1b_dependencies(cfg, station, date)
+
+    filepaths = []
+    for fn in input_files:
+        filepath = os.path.abspath(fn)
+        if incremental and pyrmanifest.is_up_to_date(manifest, output_path, filepath, dependencies):
+            logging.info(f"Skip {os.path.basename(filepath)}, outputs are up-to-date.")
+            continue
+        filepaths.append(filepath)
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext()
+    with pool:
+        if jobs > 1:
+            # l1b files of the same day are written by this process only
+            results = pool.map(partial(_process_l1b, config=config, cfg=cfg, stats=stats), filepaths)
+        else:
+            results = (_process_l1b(filepath, config, cfg, stats) for filepath in filepaths)
+
+        with click.progressbar(zip(filepaths, results), length=len(filepaths), label='Processing') as files:
+            for filepath, ds in files:
+                filename = os.path.basename(filepath)
+                if ds is None:
+                    logger.debug(f"{filename} is skipped.")
+                    continue
+
+                box = int(ds.station.values[0])
+                udays = np.unique(ds.time.values.astype("datetime64[D]"))
+                for day in udays:
+                    day = pd.to_datetime(day)
+                    logging.info(f"process day {day:%Y-%m-%d}")
+                    dsd = ds.sel(time=f"{day:%Y-%m-%d}")
+                    outfile = os.path.join(output_path, cfg['output_l1b'])
+                    outfile = outfile.format_map(
+                        dict(
+                            dt=day,
+                            campaign=cfg['campaign'],
+                            station=box,
+                            collection=int(cfg['collection']),
+                            sfx="nc"
+                        )
+                    )
+                    pyrdata.to_netcdf(dsd,outfile)
+                    logging.info(f"l1b saved to {outfile}")
+                    if quicklook is not None:
+                        # the l1b file may be merged with earlier data of the day
+                        with xr.open_dataset(outfile) as dso:
+                            pyrquicklook.update_quicklook(dso.load(), quicklook, config=config)
+                    if not incremental:
+                        continue
+                    # a day may be merged from several l1a files, e.g. segments of --split
+                    known = manifest["outputs"].get(os.path.basename(outfile), {}).get("inputs", {})
+                    inputs = sorted({fn for fn in known if os.path.exists(fn)} | {filepath})
+                    manifest = pyrmanifest.record_output(
+                        manifest, outfile,
+                        inputs=inputs,
+                        dependencies=dependencies(box, day),
                         station=box,
-                        collection=int(cfg['collection']),
-                        sfx="nc"
+                        date=day,
                     )
-                )
-                pyrdata.to_netcdf(dsd,outfile)
-                logging.info(f"l1b saved to {outfile}")
+                if incremental:
+                    pyrmanifest.write_manifest(output_path, manifest)
 
 cli.add_command(process)
 process.add_command(process_l1a)
@@ -168,89 +343,321 @@ process.add_command(process_l1b)
 @click.argument("output_file", nargs=1)
 @click.option("-f","--freq",nargs=1,help="Sampling frequency for regular time grid. The default is 1s.")
 @click.option("-t","--timevar", nargs=1, help="Name of the variable storing the time index. The default is 'time'.")
-def merge(input_files, output_file,freq=None,timevar=None):
-    def _read_radflux_attrs(ds):
-        def _ensure_list(a):
-            if (not isinstance(a, Iterable)) or isinstance(a, str):
-                return [a]
-            else:
-                return list(a)
-
-        vattrs = {}
-        for var in ['ghi', 'gti']:
-            vattrs.update({
-                var: {
-                    "serial": _ensure_list(ds[var].serial),
-                    "calibration_factor": _ensure_list(ds[var].calibration_factor)
-                }
-            })
-            if var == "gti":
-                vattrs = assoc_in(vattrs, ["gti", "hangle"],
-                                  _ensure_list(ds[var].hangle))
-                vattrs = assoc_in(vattrs, ["gti", "vangle"],
-                                  _ensure_list(ds[var].vangle))
-
-        return vattrs
+@click.option("-u","--update", is_flag=True, help="Overwrite the station slots of an existing OUTPUT_FILE in place with INPUT_FILES, instead of merging all files again.")
+@click.option("--stats",
+              help="Append wall time, CPU time and peak memory of the processing stages as JSON lines to this file.")
+def merge(input_files, output_file,freq=None,timevar=None,update=False,stats=None):
+    import xarray as xr
+    from . import data as pyrdata
+    from . import instrument as pyrinst
 
     if timevar is None:
         timevar = "time"
     if freq is None:
         freq = '1s'
 
+    if update:
+        if not os.path.exists(output_file):
+            raise click.BadParameter(f"{output_file} does not exist, update requires an existing network file.")
+        with click.progressbar(input_files, label='Updating') as files:
+            for fn in files:
+                dst = xr.open_dataset(fn)
+                try:
+                    pyrdata.update_network(output_file, dst, timevar=timevar)
+                except ValueError as e:
+                    logger.warning(f"Skip {os.path.basename(fn)}: {e}")
+                dst.close()
+        return
+
     with click.progressbar(input_files, label='Merging') as files:
+        ds = pyrdata.merge_network(files, freq=freq, timevar=timevar)
 
-        for i, fn in enumerate(files):
-            dst = xr.open_dataset(fn)
-            # unify time dimension to speed up merging
-            date = dst.time.values[0].astype("datetime64[D]")
-            timeidx = pd.date_range(date, date + np.timedelta64(1, 'D'), freq=freq, inclusive='left')
-            dst = dst.reindex(time=timeidx, method='nearest', tolerance=np.timedelta64(1, 'ms'))
-
-            # add gti for single stations
-            if "gti" not in dst:
-                dst = dst.assign({
-                    "gti": (("time", "station"), np.full(dst.ghi.values.shape, np.nan)),
-                    "gti_qc": (("station"), np.full(dst.ghi_qc.values.shape, np.nan))
-                })
-                dst.gti.attrs.update({
-                    "serial":"",
-                    "calibration_factor": 0,
-                    "vangle": 0,
-                    "hangle": 0
-                })
-
-            if i==0:
-                ds = dst.copy()
-                vattrs_radflx = _read_radflux_attrs(ds)
-                continue
-
-            st = dst.station.values[0]
-            if st not in ds.station.values:
-                vattrs_temp = _read_radflux_attrs(dst)
-                vattrs_radflx.update({
-                    "ghi": merge_with(lambda x: [*x[0],*x[1]], (vattrs_radflx['ghi'], vattrs_temp['ghi'])),
-                    "gti": merge_with(lambda x: [*x[0],*x[1]], (vattrs_radflx['gti'], vattrs_temp['gti']))
-                })
-                ds = xr.concat((ds, dst), dim='station')
-            else:
-                overwrite_vars = [v for v in ds if timevar not in ds[v].dims]
-                ds = ds.merge(dst,
-                              compat='no_conflicts',
-                              overwrite_vars=overwrite_vars)
-            dst.close()
-
-    # special treatment for flux variables
-    for k in ['ghi', 'gti']:
-        if k not in ds:
-            continue
-        # add concatenated attrs
-        ds[k].attrs.update(vattrs_radflx[k])
+    with _record_stats(stats, command="merge", output=os.path.basename(output_file)):
+        ds = pyrdata.add_encoding(ds)
+        with pyrinst.stage("to_netcdf"):
+            ds.to_netcdf(output_file)
+
+cli.add_command(merge)
 
-    ds = pyrdata.add_encoding(ds)
+@click.command("pyramid")
+@click.argument("input_files", nargs=-1)
+@click.argument("output_path", nargs=1)
+@click.option("--config","-c",
+              nargs=1,
+              help="Specify config files with override the default config.")
+@click.option("--freq", "-f", multiple=True,
+              help="Resolution of a level, repeat for several levels. The default is config 'pyramid_freqs'.")
+@click.option("--stats",
+              help="Append wall time, CPU time and peak memory of the processing stages as JSON lines to this file.")
+def pyramid(input_files, output_path, config, freq, stats):
+    """
+    Aggregate l1b station or network files to coarser resolutions, stored as groups of one file per input file.
+    """
+    import pandas as pd
+    import xarray as xr
+    from . import data as pyrdata
+    from . import utils as pyrutils
 
-    ds.to_netcdf(output_file)
+    if config is not None:
+        config = pyrutils.read_json(config)
+    cfg = pyrdata.get_config(config)
+    freqs = list(freq) if len(freq) > 0 else cfg['pyramid_freqs']
 
-cli.add_command(merge)
+    with click.progressbar(input_files, label='Aggregating') as files:
+        for fn in files:
+            filename = os.path.basename(fn)
+            with _record_stats(stats, command="pyramid", input=filename):
+                with xr.open_dataset(fn) as ds:
+                    levels = pyrdata.to_pyramid(ds.load(), freqs, config=config)
+                template = 'output_l1b_pyramid_network' if ds.station.size > 1 else 'output_l1b_pyramid'
+                outfile = os.path.join(output_path, cfg[template])
+                outfile = outfile.format_map(
+                    dict(
+                        dt=pd.to_datetime(ds.time.values[0]),
+                        campaign=cfg['campaign'],
+                        station=int(ds.station.values[0]),
+                        collection=int(cfg['collection']),
+                        sfx="nc"
+                    )
+                )
+                pyrdata.pyramid_to_netcdf(levels, outfile)
+                logging.info(f"pyramid saved to {outfile}")
+
+cli.add_command(pyramid)
+
+@click.command("index")
+@click.argument("archive_path", nargs=1)
+@click.argument("catalog_file", nargs=1)
+def index(archive_path, catalog_file):
+    """
+    Index (or update the index of) all PyrNet files in ARCHIVE_PATH to the SQLite database CATALOG_FILE.
+    """
+    from . import catalog as pyrcatalog
+    stats = pyrcatalog.index_archive(archive_path, catalog_file)
+    logging.info(f"Catalog {catalog_file} updated: {stats}")
+
+cli.add_command(index)
+
+@click.command("watch")
+@click.argument("watch_paths", nargs=-1)
+@click.argument("output_path", nargs=1)
+@click.option("--config","-c",
+              nargs=1,
+              help="Specify config files with override the default config.")
+@click.option("--report","-r",
+              help="Specify the maintenance report file. If empty or 'online' it attempts to request it online.")
+@click.option("--interval", type=float, default=30., help="Seconds between two polls. The default is 30.")
+@click.option("--settle", type=float, default=60.,
+              help="Seconds a raw file has to be unchanged, to be processed. The default is 60.")
+@click.option("--jobs", "-j", type=int, default=2, help="Number of worker processes. The default is 2.")
+@click.option("--once", is_flag=True, help="Poll and process only once, then exit.")
+def watch(watch_paths, output_path, config, report, interval, settle, jobs, once):
+    """
+    Poll WATCH_PATHS for new or grown raw files and process them to l1a, l1b and network l1b files in OUTPUT_PATH.
+    """
+    from . import data as pyrdata
+    from . import utils as pyrutils
+    from . import reports as pyrreports
+    from . import watch as pyrwatch
+
+    if config is not None:
+        config = pyrutils.read_json(config)
+    cfg = pyrdata.get_config(config)
+
+    # parse maintenance reports, index once, the report is parsed for each file
+    if report is None:
+        df_report = None
+    elif report=="online":
+        df_report = pyrreports.index_report(pyrreports.get_responses(fn=None, online=cfg["online"]))
+    else:
+        df_report = pyrreports.index_report(pyrreports.get_responses(fn=report))
+
+    try:
+        total = pyrwatch.watch(watch_paths, output_path,
+                               config=config,
+                               report=df_report,
+                               interval=interval,
+                               settle=settle,
+                               jobs=jobs,
+                               once=once)
+        logging.info(f"Watch finished: {total['files']} files processed.")
+    except KeyboardInterrupt:
+        logging.info("Watch stopped.")
+
+cli.add_command(watch)
+
+@click.command("stream")
+@click.argument("input_file", nargs=1, default="-")
+@click.option("--output", "-o", default="-", help="Write the averages as CSV to this file. The default is stdout.")
+@click.option("--config","-c",
+              nargs=1,
+              help="Specify config files with override the default config.")
+@click.option("--station", "-s", type=int,
+              help="Station number, to calibrate ghi and gti to W m-2. If not specified, ghi and gti are in V.")
+@click.option("--freq", "-f", default="1s", help="Width of the time bins. The default is 1s.")
+@click.option("--forgetting", type=float, default=1.,
+              help="Forgetting factor of the clock drift estimate in (0, 1]. The default is 1.")
+@click.option("--follow", is_flag=True, help="Follow INPUT_FILE, while it is written by the logger, like 'tail -f'.")
+def stream(input_file, output, config, station, freq, forgetting, follow):
+    """
+    Process the logger line stream from INPUT_FILE (default: stdin) to averages in near real time.
+    """
+    import numpy as np
+    from . import data as pyrdata
+    from . import utils as pyrutils
+    from . import pyrnet
+    from . import stream as pyrstream
+
+    if config is not None:
+        config = pyrutils.read_json(config)
+    cfg = pyrdata.get_config(config)
+    date_of_measure = np.datetime64(cfg['date_of_measure'])
+
+    calibration = None
+    if station is not None:
+        _, _, calibration = pyrnet.meta_lookup(
+            date_of_measure,
+            box=station,
+            cfile=cfg['file_calibration'],
+            mapfile=cfg['file_mapping'],
+        )
+
+    if follow:
+        lines = pyrstream.follow(input_file)
+    else:
+        lines = click.open_file(input_file, "r", errors="ignore")
+
+    columns = None
+    with click.open_file(output, "w") as f:
+        try:
+            for rec in pyrstream.stream_averages(lines,
+                                                 date_of_measure=date_of_measure,
+                                                 freq=freq,
+                                                 forgetting=forgetting,
+                                                 calibration=calibration):
+                if columns is None:
+                    columns = list(rec.keys())
+                    f.write(",".join(columns) + "\n")
+                f.write(",".join(str(rec[k]) for k in columns) + "\n")
+                # emit each average immediately
+                f.flush()
+        except KeyboardInterrupt:
+            logging.info("Stream stopped.")
+
+cli.add_command(stream)
+
+@click.command("health")
+@click.argument("input_files", nargs=-1)
+@click.option("--output", "-o", default="-", help="Write the statistics per station as CSV to this file. The default is stdout.")
+@click.option("--per-file", is_flag=True, help="Write the statistics of each l1a file instead of per station.")
+def health(input_files, output, per_file):
+    """
+    Aggregate the station health statistics of the l1a INPUT_FILES of a campaign, read from the file headers only.
+    """
+    from . import data as pyrdata
+
+    df = pyrdata.read_health(input_files)
+    if len(df) == 0:
+        logging.warning("No health statistics found.")
+        return
+    if not per_file:
+        df = pyrdata.summarize_health(df)
+    with click.open_file(output, "w") as f:
+        df.to_csv(f, index=not per_file)
+
+cli.add_command(health)
+
+@click.command("dedup")
+@click.argument("input_files", nargs=-1)
+@click.option("--db", "-d", required=True, help="SQLite database of the deduplication index, created if it not exists.")
+@click.option("--config","-c",
+              nargs=1,
+              help="Specify config files with override the default config.")
+@click.option("--blocksize", type=int, default=2**20, help="Size of the raw blocks in bytes. The default is 1 MiB.")
+@click.option("--overlaps", is_flag=True,
+              help="Parse the input files and index blocks of ADC records, to find overlapping files.")
+@click.option("--blocktime", default="10min", help="Length of the ADC blocks with --overlaps. The default is 10min.")
+@click.option("--output", "-o", default="-", help="Write the report as CSV to this file. The default is stdout.")
+def dedup(input_files, db, config, blocksize, overlaps, blocktime, output):
+    """
+    Index raw INPUT_FILES and report duplicates, prefixes and overlaps with other indexed files.
+    The column 'skip' marks input files, which are contained in another input file.
+    """
+    import numpy as np
+    from . import data as pyrdata
+    from . import utils as pyrutils
+    from . import dedup as pyrdedup
+
+    if config is not None:
+        config = pyrutils.read_json(config)
+    cfg = pyrdata.get_config(config)
+
+    pyrdedup.index_files(input_files, db,
+                         blocksize=blocksize,
+                         blocktime=blocktime if overlaps else None,
+                         date_of_measure=np.datetime64(cfg['date_of_measure']))
+    df = pyrdedup.find_duplicates(input_files, db)
+    redundant = pyrdedup.redundant_files(df, input_files)
+    df = df.assign(skip=df.file.isin(redundant))
+    logging.info(f"{len(redundant)} of {len(input_files)} files are contained in other input files.")
+    with click.open_file(output, "w") as f:
+        df.to_csv(f, index=False)
+
+cli.add_command(dedup)
+
+@click.group("quicklook")
+def quicklook():
+    """
+    Min/max decimated quicklook tiles of l1b data for plots of long periods.
+    """
+
+@click.command("update")
+@click.argument("input_files", nargs=-1)
+@click.option("--db", "-d", required=True, help="SQLite database of the quicklook tiles, created if it not exists.")
+@click.option("--config","-c",
+              nargs=1,
+              help="Specify config files with override the default config.")
+def quicklook_update(input_files, db, config):
+    """
+    Update the quicklook tiles with l1b station or network INPUT_FILES.
+    """
+    import xarray as xr
+    from . import utils as pyrutils
+    from . import quicklook as pyrquicklook
+
+    if config is not None:
+        config = pyrutils.read_json(config)
+
+    with click.progressbar(input_files, label='Updating') as files:
+        for fn in files:
+            with xr.open_dataset(fn) as ds:
+                pyrquicklook.update_quicklook(ds.load(), db, config=config)
+
+@click.command("query")
+@click.argument("start", nargs=1)
+@click.argument("end", nargs=1)
+@click.option("--db", "-d", required=True, help="SQLite database of the quicklook tiles.")
+@click.option("--width", "-w", type=int, default=1000, help="Width of the plot in pixels. The default is 1000.")
+@click.option("--station", "-s", type=int, multiple=True, help="Station to return, repeat for several stations. The default is all stations.")
+@click.option("--variable", "-v", multiple=True, help="Variable to return, repeat for several variables. The default is all variables.")
+@click.option("--output", "-o", default="-", help="Write the tiles as CSV to this file. The default is stdout.")
+def quicklook_query(start, end, db, width, station, variable, output):
+    """
+    Query the quicklook tiles from START to END (YYYY-MM-DDThh:mm), at the level matching the plot width.
+    """
+    import numpy as np
+    from . import quicklook as pyrquicklook
+
+    df = pyrquicklook.query_quicklook(db, np.datetime64(start), np.datetime64(end), width,
+                                      stations=list(station) if len(station) > 0 else None,
+                                      variables=list(variable) if len(variable) > 0 else None)
+    logging.info(f"{len(df)} tiles of {df.attrs['resolution']}.")
+    with click.open_file(output, "w") as f:
+        df.to_csv(f, index=False)
+
+cli.add_command(quicklook)
+quicklook.add_command(quicklook_update)
+quicklook.add_command(quicklook_query)
 
 
 
@@ -1,8 +1,9 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/data.ipynb.
 
 # %% auto 0
-__all__ = ['pyrnet_version', 'logger', 'update_coverage_meta', 'stretch_resolution', 'merge_ds', 'to_netcdf', 'get_config',
-           'get_cfmeta', 'add_encoding', 'to_l1a', 'to_l1b']
+__all__ = ['pyrnet_version', 'logger', 'update_coverage_meta', 'stretch_resolution', 'merge_ds', 'to_netcdf', 'update_network',
+           'merge_network', 'get_config', 'get_cfmeta', 'add_encoding', 'health_stats', 'to_l1a', 'read_health',
+           'summarize_health', 'to_l1b', 'to_pyramid', 'pyramid_to_netcdf']
 
 # %% ../../nbs/pyrnet/data.ipynb 2
 import os
@@ -10,26 +11,18 @@ import numpy as np
 import pandas as pd
 import xarray as xr
 import logging
-from toolz import assoc_in
-import pkg_resources as pkg_res
+from toolz import assoc_in, merge_with
+from collections.abc import Iterable
 import warnings
 
-from trosat import sunpos as sp
-
 import pyrnet as pyrnet_main
 pyrnet_version = pyrnet_main.__version__
 from . import pyrnet
 from . import utils as pyrutils
 from . import logger as pyrlogger
 from . import reports as pyrreports
+from . import instrument as pyrinst
 
-# logging setup
-logging.basicConfig(
-    filename='pyrnet.log',
-    encoding='utf-8',
-    level=logging.DEBUG,
-    format='%(asctime)s %(name)s %(levelname)s:%(message)s'
-)
 logger = logging.getLogger(__name__)
 
 # %% ../../nbs/pyrnet/data.ipynb 5
@@ -104,6 +97,7 @@ def merge_ds(ds1,ds2,timevar="time"):
     return ds_new
 
 # %% ../../nbs/pyrnet/data.ipynb 8
+@pyrinst.timed()
 def to_netcdf(ds,fname, timevar="time"):
     """xarray to netcdf, but merge if exist
     """
@@ -120,11 +114,195 @@ def to_netcdf(ds,fname, timevar="time"):
                  encoding={timevar:{'dtype':'float64'}}) # for OpenDAP 2 compatibility
 
 # %% ../../nbs/pyrnet/data.ipynb 10
+_network_station_attrs = {
+    "serial": "",
+    "calibration_factor": 0.,
+    "hangle": 0.,
+    "vangle": 0.,
+}
+
+def update_network(fname, ds, timevar="time"):
+    """
+    Overwrite the slot of one station in an existing network l1b file in place.
+
+    Parameters
+    ----------
+    fname: str
+        Path of the network l1b file, e.g., generated by ``pyrnet merge``.
+    ds: xr.Dataset
+        Single station l1b Dataset of the same day, e.g., the output of `to_l1b`.
+    timevar: str
+        Name of the time variable. The default is 'time'.
+
+    Returns
+    -------
+    int
+        Index of the updated station slot in the network file.
+    """
+    import netCDF4
+    station = int(ds.station.values[0])
+    ds = ds.isel(station=0)
+
+    with netCDF4.Dataset(fname, 'a') as nc:
+        # lookup station slot
+        islot = np.flatnonzero(nc["station"][:] == station)
+        if islot.size == 0:
+            raise ValueError(f"Station {station} is not part of {fname}, a full merge is required.")
+        islot = int(islot[0])
+
+        # match the station time to the (regular) network time
+        nctime = netCDF4.num2date(nc[timevar][:], nc[timevar].units,
+                                  only_use_cftime_datetimes=False,
+                                  only_use_python_datetimes=True)
+        nctime = pd.DatetimeIndex(nctime)
+        itime = nctime.get_indexer(ds[timevar].values,
+                                   method='nearest',
+                                   tolerance=np.timedelta64(1, 'ms'))
+        mtime = itime >= 0
+        if not np.any(mtime):
+            raise ValueError(f"Time of station {station} does not match the time of {fname}.")
+        logger.info(f"Update station {station} (slot {islot}) in {fname}.")
+
+        for var in nc.variables:
+            if var in [timevar, "station"]:
+                continue
+            dims = nc[var].dimensions
+            if dims == (timevar, "station"):
+                # rewrite only the column of this station
+                column = np.full(nctime.size, np.nan)
+                if var in ds:
+                    column[itime[mtime]] = ds[var].values[mtime]
+                nc[var][:, islot] = np.ma.masked_array(np.nan_to_num(column), mask=np.isnan(column))
+            elif dims == ("station",):
+                value = np.nan
+                if var in ds:
+                    value = float(ds[var].values)
+                nc[var][islot] = np.ma.masked_array(np.nan_to_num(value), mask=np.isnan(value))
+
+            # per station attributes of the radiation flux variables
+            for key, default in _network_station_attrs.items():
+                if key not in nc[var].ncattrs():
+                    continue
+                values = list(np.atleast_1d(nc[var].getncattr(key)))
+                if len(values) != nc.dimensions["station"].size:
+                    continue
+                values[islot] = ds[var].attrs.get(key, default) if var in ds else default
+                nc[var].setncattr(key, np.array(values))
+
+        # time coverage of the stations
+        tstart, tend = ds[timevar].values[mtime][[0, -1]]
+        if "time_coverage_start" in nc.ncattrs():
+            tstart = min(tstart, np.datetime64(nc.getncattr("time_coverage_start")))
+            tend = max(tend, np.datetime64(nc.getncattr("time_coverage_end")))
+        nc.setncatts({
+            'time_coverage_start': pd.to_datetime(tstart).isoformat(),
+            'time_coverage_end': pd.to_datetime(tend).isoformat(),
+            'time_coverage_duration': pd.to_timedelta(tend - tstart).isoformat(),
+        })
+
+        now = pd.to_datetime(np.datetime64("now"))
+        nc.setncattr("history",
+                     getattr(nc, "history", "") + f"{now.isoformat()}: Updated station {station} by pyrnet version {pyrnet_version}; ")
+    return islot
+
+# %% ../../nbs/pyrnet/data.ipynb 12
+def _read_radflux_attrs(ds):
+    """ Per station attributes of the radiation flux variables as lists.
+    """
+    def _ensure_list(a):
+        if (not isinstance(a, Iterable)) or isinstance(a, str):
+            return [a]
+        else:
+            return list(a)
+
+    vattrs = {}
+    for var in ['ghi', 'gti']:
+        vattrs.update({
+            var: {
+                "serial": _ensure_list(ds[var].serial),
+                "calibration_factor": _ensure_list(ds[var].calibration_factor)
+            }
+        })
+        if var == "gti":
+            vattrs = assoc_in(vattrs, ["gti", "hangle"],
+                              _ensure_list(ds[var].hangle))
+            vattrs = assoc_in(vattrs, ["gti", "vangle"],
+                              _ensure_list(ds[var].vangle))
+
+    return vattrs
+
+def merge_network(fnames, *, freq='1s', timevar='time') -> xr.Dataset:
+    """
+    Merge l1b station files of one day to a network Dataset.
+
+    Parameters
+    ----------
+    fnames: iterable of str
+        Paths of the l1b station files of the same day.
+    freq: str
+        Sampling frequency of the regular time grid. The default is '1s'.
+    timevar: str
+        Name of the variable storing the time index. The default is 'time'.
+
+    Returns
+    -------
+    xr.Dataset
+        Network Dataset, without encoding (see `add_encoding`).
+    """
+    for i, fn in enumerate(fnames):
+        dst = xr.open_dataset(fn)
+        # unify time dimension to speed up merging
+        date = dst.time.values[0].astype("datetime64[D]")
+        timeidx = pd.date_range(date, date + np.timedelta64(1, 'D'), freq=freq, inclusive='left')
+        dst = dst.reindex(time=timeidx, method='nearest', tolerance=np.timedelta64(1, 'ms'))
+
+        # add gti for single stations
+        if "gti" not in dst:
+            dst = dst.assign({
+                "gti": (("time", "station"), np.full(dst.ghi.values.shape, np.nan)),
+                "gti_qc": (("station"), np.full(dst.ghi_qc.values.shape, np.nan))
+            })
+            dst.gti.attrs.update({
+                "serial":"",
+                "calibration_factor": 0,
+                "vangle": 0,
+                "hangle": 0
+            })
+
+        if i==0:
+            ds = dst.copy()
+            vattrs_radflx = _read_radflux_attrs(ds)
+            continue
+
+        st = dst.station.values[0]
+        if st not in ds.station.values:
+            vattrs_temp = _read_radflux_attrs(dst)
+            vattrs_radflx.update({
+                "ghi": merge_with(lambda x: [*x[0],*x[1]], (vattrs_radflx['ghi'], vattrs_temp['ghi'])),
+                "gti": merge_with(lambda x: [*x[0],*x[1]], (vattrs_radflx['gti'], vattrs_temp['gti']))
+            })
+            ds = xr.concat((ds, dst), dim='station')
+        else:
+            overwrite_vars = [v for v in ds if timevar not in ds[v].dims]
+            ds = ds.merge(dst,
+                          compat='no_conflicts',
+                          overwrite_vars=overwrite_vars)
+        dst.close()
+
+    # special treatment for flux variables
+    for k in ['ghi', 'gti']:
+        if k not in ds:
+            continue
+        # add concatenated attrs
+        ds[k].attrs.update(vattrs_radflx[k])
+    return ds
+
+# %% ../../nbs/pyrnet/data.ipynb 14
 def get_config(config: dict|None = None) -> dict:
     """Read default config and merge with input config
     """
 
-    fn_config = pkg_res.resource_filename("pyrnet", "share/pyrnet_config.json")
+    fn_config = pyrutils.resource_filename("share/pyrnet_config.json")
     default_config = pyrutils.read_json(fn_config)
     if config is None:
         config = default_config
@@ -140,7 +318,7 @@ def get_config(config: dict|None = None) -> dict:
     }
     for fn in cfiles:
         if config[fn] is None:
-            config[fn] =  pkg_res.resource_filename("pyrnet", cfiles[fn])
+            config[fn] =  pyrutils.resource_filename(cfiles[fn])
     return config
 
 def get_cfmeta(config: dict|None = None) -> dict:
@@ -160,7 +338,8 @@ def get_cfmeta(config: dict|None = None) -> dict:
     return gattrs ,vattrs, vencode
 
 
-# %% ../../nbs/pyrnet/data.ipynb 15
+# %% ../../nbs/pyrnet/data.ipynb 19
+@pyrinst.timed()
 def add_encoding(ds, vencode=None):
     """
     Set valid_range attribute and encoding to every variable of the dataset.
@@ -246,6 +425,12 @@ def add_encoding(ds, vencode=None):
                 "valid_range": valid_range
             })
 
+        # chunks of a single station, updating a station of a network file (`update_network`)
+        # rewrites the chunks of this station only
+        for k in ds:
+            if ds[k].dims == ("time", "station"):
+                ds[k].encoding.update({"chunksizes": (ds.time.size, 1)})
+
         ds["time"].encoding.update({
             "dtype": 'f8',
             "units": f"seconds since {np.datetime_as_string(ds.time.data[0], unit='D')}T00:00Z",
@@ -254,7 +439,74 @@ def add_encoding(ds, vencode=None):
         raise ValueError("Dataset has no 'processing_level' attribute.")
     return ds
 
-# %% ../../nbs/pyrnet/data.ipynb 17
+# %% ../../nbs/pyrnet/data.ipynb 22
+# ADC columns of the logger records and conversion of ADC counts to physical values (scale_factor, add_offset)
+_adc_vars = {
+    "ta": (2, 3.3 / 1023. * 20. * 2., 253.15), # [K]
+    "rh": (3, 3.3 / 1023. * 0.2 * 2., 0.), # [-]
+    "ghi": (4, 3.3 / 1023. / 300., 0.), # [V]
+    "battery_voltage": (5, 3.3 / 1023. * 2., 0.), # [V]
+    "gti": (6, 3.3 / 1023. / 300., 0.), # [V]
+}
+_adc_fill = np.iinfo(np.uint16).max
+
+def health_stats(rec_adc, rec_gprmc, adctime, counts: dict|None = None, *, maxstep: float = 2000.) -> dict:
+    """
+    Station health statistics of the records of a raw logger file.
+
+    Parameters
+    ----------
+    rec_adc: ndarray
+        ADC records, see `pyrnet.logger.read_records`.
+    rec_gprmc: recarray
+        GPRMC records, see `pyrnet.logger.read_records`.
+    adctime: ndarray(timedelta64)
+        Time of the ADC records from start, see `pyrnet.logger.get_adc_time`.
+    counts: dict or None
+        Counts of lines not parsed to records, see `pyrnet.logger.read_records`. If None, they are assumed to be zero.
+    maxstep: float
+        Segmentation of the GPS records, see `pyrnet.logger.fit_segments`. The default is 2000.
+
+    Returns
+    -------
+    dict
+        Number of ADC 'samples' and the mean 'sample_rate' [Hz], number of 'gps_records' with fix and
+        the 'gps_fix_ratio' of all GPRMC lines, number of dropped 'incomplete' lines, 'unknown' lines and
+        'restarts' of the logger (header written again), 'battery_min' and 'battery_mean' [V],
+        mean clock 'drift' [s/day], 'sync_segments' and the largest 'sync_jitter' [ms] of the GPS sync.
+    """
+    counts = {} if counts is None else counts
+    ta = adctime/np.timedelta64(1, 'ms')
+    nvoid = counts.get("gps_void", 0)
+    duration = (ta[-1] - ta[0])/1000.
+    stats = {
+        "samples": int(rec_adc.shape[0]),
+        "sample_rate": float((ta.size - 1)/duration) if duration > 0 else np.nan,
+        "gps_records": int(rec_gprmc.size),
+        "gps_fix_ratio": float(rec_gprmc.size/(rec_gprmc.size + nvoid)),
+        "incomplete": counts.get("incomplete", 0),
+        "unknown": counts.get("unknown", 0),
+        "restarts": counts.get("headers", 0),
+    }
+    # battery voltage from the ADC counts
+    col, scale_factor, add_offset = _adc_vars["battery_voltage"]
+    battery = rec_adc[:, col]*scale_factor + add_offset
+    stats.update({
+        "battery_min": float(np.min(battery)),
+        "battery_mean": float(np.mean(battery)),
+    })
+    # drift and jitter of the ADC clock to GPS
+    iadc = np.minimum(rec_gprmc.iadc.astype(int), ta.size - 1)
+    t2 = (rec_gprmc.time - rec_gprmc.time[0])/np.timedelta64(1, 'ms')
+    segments = pyrlogger.fit_segments(ta[iadc], t2, maxstep=maxstep)
+    stats.update({
+        "drift": float(np.average(segments.drift, weights=segments.stop - segments.start)),
+        "sync_segments": int(segments.size),
+        "sync_jitter": float(np.max(segments.jitter)),
+    })
+    return stats
+
+@pyrinst.timed()
 def to_l1a(
         fname : str,
         *,
@@ -262,7 +514,8 @@ def to_l1a(
         report: dict|pd.DataFrame|None,
         date_of_measure : np.datetime64 = np.datetime64("now"),
         config: dict|None = None,
-        global_attrs: dict|None = None
+        global_attrs: dict|None = None,
+        records: tuple|None = None
 ) -> xr.Dataset|None:
     """
     Read logger raw file and parse it to xarray Dataset. Thereby, attributes and names are defined via cfmeta.json file and sun position values are calculated and added.
@@ -287,6 +540,9 @@ def to_l1a(
                 the default is 5.
     global_attrs: dict
         Additional global attributes for the Dataset. (Overrides cfmeta.json attributes)
+    records: tuple or None
+        ADC and GPRMC records and optionally the counts of lines not parsed of the raw file,
+        e.g. a segment from `pyrnet.logger.read_segments`. If None, the records are read from *fname*.
     Returns
     -------
     xarray.Dataset
@@ -301,7 +557,12 @@ def to_l1a(
     date_of_measure = pyrutils.to_datetime64(date_of_measure)
 
     # 1. Parse raw file
-    rec_adc, rec_gprmc = pyrlogger.read_records(fname=fname, date_of_measure=date_of_measure)
+    if records is None:
+        line_counts = {}
+        rec_adc, rec_gprmc = pyrlogger.read_records(fname=fname, date_of_measure=date_of_measure, counts=line_counts)
+    else:
+        rec_adc, rec_gprmc = records[:2]
+        line_counts = records[2] if len(records) > 2 else None
 
     if type(rec_adc)==bool or len(rec_gprmc.time)<3:
         logger.debug("Failed to load the data from the file, because of not enough stable GPS data, or file is empty.")
@@ -310,9 +571,8 @@ def to_l1a(
     # Get ADC time
     adctime = pyrlogger.get_adc_time(rec_adc)
 
-    # ADC to Volts
-    # Drop time and internal battery sensor output (columns 0 and 1)
-    adc_volts = 3.3 * rec_adc[:,2:] / 1023.
+    # Station health statistics of the parsed records
+    health = health_stats(rec_adc, rec_gprmc, adctime, line_counts)
 
     # 2. Get Logbook maintenance quality flags
     key = f"{station:03d}"
@@ -355,6 +615,8 @@ def to_l1a(
         'product_version': pyrnet_version,
         'history': f'{now.isoformat()}: Generated level l1a  by pyrnet version {pyrnet_version}; ',
     })
+    # health statistics are stored in the header, to be read without the data (see `read_health`)
+    gattrs.update({f"health_{k}": v for k, v in health.items()})
     # add site information
     if config['sites'] is not None:
         sites = pyrutils.read_json(config['file_site'])[config['sites']]
@@ -374,17 +636,25 @@ def to_l1a(
             vattrs = assoc_in(vattrs, ["gti","hangle"], hangle)
             vattrs = assoc_in(vattrs, ["gti","vangle"], vangle)
 
-    if adc_volts.shape[1]<5: # gti data is not available
-        adc_volts = np.concatenate((adc_volts,-1*np.ones(adc_volts.shape[0])[:,None]),axis=1)
+    # Keep the ADC counts (views of rec_adc) as packed integers, conversion to physical units
+    # is done lazily by decoding the scale_factor and add_offset.
+    # Drop time and internal battery sensor output (columns 0 and 1)
+    adc_vars = {}
+    for k, (i, scale_factor, add_offset) in _adc_vars.items():
+        if i < rec_adc.shape[1]:
+            counts = rec_adc[:,i][:,None]
+        else: # e.g. gti data is not available
+            counts = np.broadcast_to(np.uint16(_adc_fill), (rec_adc.shape[0], 1))
+        adc_vars[k] = (("adctime","station"), counts, {
+            "scale_factor": scale_factor,
+            "add_offset": add_offset,
+            "_FillValue": _adc_fill,
+        })
 
     # 8. Make xarray Dataset
     ds = xr.Dataset(
         data_vars={
-            "ghi": (("adctime","station"), adc_volts[:,2][:,None] / 300.), # [V]
-            "gti": (("adctime","station"), adc_volts[:,4][:,None] / 300.), # [V]
-            "ta": (("adctime","station"), 253.15 + 20.*2.*adc_volts[:,0][:,None]), # [K]
-            "rh": (("adctime","station"), 0.2*2.*adc_volts[:,1][:,None]), # [-]
-            "battery_voltage": (("adctime","station"), 2.*adc_volts[:,3][:,None]), # [V]
+            **adc_vars,
             "lat": (("gpstime","station"), rec_gprmc.lat[:,None]), # [degN]
             "lon": (("gpstime","station"), rec_gprmc.lon[:,None]), # [degE]
             "ghi_qc": ("station", [qc_main]),
@@ -398,6 +668,7 @@ def to_l1a(
         },
         attrs=gattrs
     )
+    ds = xr.decode_cf(ds, decode_times=False, decode_timedelta=False)
 
     # drop ocurance of douplicate gps values
     ds = ds.drop_duplicates("gpstime")
@@ -416,7 +687,86 @@ def to_l1a(
 
     return ds
 
-# %% ../../nbs/pyrnet/data.ipynb 46
+# %% ../../nbs/pyrnet/data.ipynb 26
+def read_health(fnames: list[str]) -> pd.DataFrame:
+    """
+    Station health statistics of l1a files, read from the file headers.
+
+    Parameters
+    ----------
+    fnames: list of str
+        Paths of l1a files.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per file with 'file', 'station', time coverage 'start' and 'end' and the statistics of `health_stats`.
+        Files without health statistics are skipped.
+    """
+    import netCDF4
+    rows = []
+    for fname in fnames:
+        with netCDF4.Dataset(fname, 'r') as nc:
+            attrs = {k: nc.getncattr(k) for k in nc.ncattrs()}
+            if "health_samples" not in attrs:
+                logger.warning(f"{fname} has no health statistics. Skip.")
+                continue
+            rows.append({
+                "file": os.path.basename(fname),
+                "station": int(nc["station"][0]),
+                "start": pd.to_datetime(attrs["time_coverage_start"]),
+                "end": pd.to_datetime(attrs["time_coverage_end"]),
+                **{k[len("health_"):]: v for k, v in attrs.items() if k.startswith("health_")},
+            })
+    return pd.DataFrame(rows)
+
+def summarize_health(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate station health statistics of l1a files per station.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        Health statistics of l1a files, see `read_health`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Statistics per station: number of 'files', 'hours' of data, 'start' and 'end', totals of
+        'samples', 'incomplete' and 'unknown' lines, 'restarts' and 'gps_records', the 'gps_fix_ratio' of all GPRMC lines,
+        'battery_min', 'battery_mean' (weighted by samples), the range of the mean 'sample_rate' and clock 'drift'
+        of the files and the largest 'sync_jitter'.
+    """
+    df = df.assign(
+        hours=(df.end - df.start)/pd.Timedelta(1, 'h'),
+        gps_lines=df.gps_records/df.gps_fix_ratio,
+        battery_sum=df.battery_mean*df.samples,
+    )
+    agg = df.groupby("station").agg(
+        files=("file", "size"),
+        hours=("hours", "sum"),
+        start=("start", "min"),
+        end=("end", "max"),
+        samples=("samples", "sum"),
+        incomplete=("incomplete", "sum"),
+        unknown=("unknown", "sum"),
+        restarts=("restarts", "sum"),
+        gps_records=("gps_records", "sum"),
+        gps_lines=("gps_lines", "sum"),
+        battery_min=("battery_min", "min"),
+        battery_sum=("battery_sum", "sum"),
+        sample_rate_min=("sample_rate", "min"),
+        sample_rate_max=("sample_rate", "max"),
+        drift_min=("drift", "min"),
+        drift_max=("drift", "max"),
+        sync_jitter=("sync_jitter", "max"),
+    )
+    agg.insert(agg.columns.get_loc("gps_records"), "gps_fix_ratio", agg.gps_records/agg.gps_lines)
+    agg.insert(agg.columns.get_loc("battery_sum"), "battery_mean", agg.battery_sum/agg.samples)
+    return agg.drop(columns=["gps_lines", "battery_sum"])
+
+# %% ../../nbs/pyrnet/data.ipynb 54
+@pyrinst.timed()
 def to_l1b(
         fname: str,
         *,
@@ -447,6 +797,8 @@ def to_l1b(
     # 3. Create new dataset (l1b)
     ds_l1b = ds_l1a.drop_dims('gpstime')
     ds_l1b = ds_l1b.drop_vars(['ghi_qc','gti_qc']) # keep only time dependend variables
+    # health statistics of the raw file (l1a only)
+    ds_l1b.attrs = {k: v for k, v in ds_l1b.attrs.items() if not k.startswith("health_")}
     ds_l1b = ds_l1b.assign({'time': ('adctime', adctime)})
     ds_l1b = ds_l1b.swap_dims({"adctime":"time"})
     ds_l1b = ds_l1b.drop_vars("adctime")
@@ -492,15 +844,17 @@ def to_l1b(
     ds_l1b = xr.merge((ds_l1b,ds_gps))
 
     # 7. Calc and add sun position
-    szen, sazi = sp.sun_angles(
-        time=ds_l1b.time.values[:,None], # line up with coordinates to keep dependence on time only
-        lat=ds_l1b.lat.values,
-        lon=ds_l1b.lon.values
-    )
-    szen  = szen.squeeze()
-    sazi = sazi.squeeze()
+    from trosat import sunpos as sp
+    with pyrinst.stage("sun_angles"):
+        szen, sazi = sp.sun_angles(
+            time=ds_l1b.time.values[:,None], # line up with coordinates to keep dependence on time only
+            lat=ds_l1b.lat.values,
+            lon=ds_l1b.lon.values
+        )
+        szen  = szen.squeeze()
+        sazi = sazi.squeeze()
 
-    esd = np.mean(sp.earth_sun_distance(ds_l1b.time.values))
+        esd = np.mean(sp.earth_sun_distance(ds_l1b.time.values))
 
     ds_l1b = ds_l1b.assign(
         {
@@ -557,3 +911,61 @@ def to_l1b(
     ds_l1b = add_encoding(ds_l1b, vencode=vencode)
 
     return ds_l1b
+
+# %% ../../nbs/pyrnet/data.ipynb 58
+@pyrinst.timed()
+def to_pyramid(ds: xr.Dataset, freqs: list[str], *, config: dict|None = None) -> dict:
+    """
+    Aggregate a l1b Dataset to several coarser resolutions.
+
+    Parameters
+    ----------
+    ds: xr.Dataset
+        l1b Dataset of a station or the network.
+    freqs: list of str
+        Resolutions of the levels, each an integer multiple of the previous, e.g. ['1min', '10min', '1h'].
+    config: dict or None
+        Config to override the default config, providing the cfmeta for the encoding.
+
+    Returns
+    -------
+    dict
+        Dataset of each level by resolution.
+    """
+    if ds.processing_level != "l1b":
+        raise ValueError("Dataset is not a l1b Dataset.")
+    widths = [pd.to_timedelta(freq) for freq in freqs]
+    for a, b in zip(widths[:-1], widths[1:]):
+        if b <= a or b % a != pd.Timedelta(0):
+            raise ValueError(f"Resolutions {freqs} have to be increasing integer multiples of each other.")
+
+    config = get_config(config)
+    _, _, vencode = get_cfmeta(config)
+    levels = {}
+    dsl = ds
+    for freq in freqs:
+        # resample from the previous level, weighted by the valid samples
+        dsl = pyrlogger.resample_mean(dsl, freq=freq, counts=True)
+        with warnings.catch_warnings():
+            # coarse levels may have a single time step, the resolution is the width of the bins
+            warnings.simplefilter("ignore", RuntimeWarning)
+            dsl = update_coverage_meta(dsl, timevar="time")
+        dsl.attrs["time_coverage_resolution"] = pd.to_timedelta(freq).isoformat()
+        now = pd.to_datetime(np.datetime64("now"))
+        dsl.attrs["history"] = dsl.history + f"{now.isoformat()}: Aggregated to {freq} by pyrnet version {pyrnet_version}; "
+        dsl = add_encoding(dsl, vencode=vencode)
+        levels[freq] = dsl
+    return levels
+
+def pyramid_to_netcdf(levels: dict, fname: str):
+    """
+    Write the levels of `to_pyramid` as groups of one netCDF file.
+    A level is read with ``xr.open_dataset(fname, group=freq)``.
+    """
+    freqs = list(levels)
+    root = xr.Dataset(attrs={**levels[freqs[0]].attrs, "pyramid_levels": " ".join(freqs)})
+    # replace the file at once, it may be read at the same time
+    root.to_netcdf(fname + ".tmp", mode="w")
+    for freq, dsl in levels.items():
+        dsl.to_netcdf(fname + ".tmp", mode="a", group=freq)
+    os.replace(fname + ".tmp", fname)
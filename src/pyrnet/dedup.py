@@ -0,0 +1,297 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/dedup.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'raw_blocks', 'adc_blocks', 'index_files', 'find_duplicates', 'redundant_files']
+
+# %% ../../nbs/pyrnet/dedup.ipynb 2
+import os
+import gzip
+import sqlite3
+import hashlib
+import logging
+from contextlib import closing
+import numpy as np
+import pandas as pd
+
+from . import logger as pyrlogger
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/dedup.ipynb 5
+def _open(fname):
+    """ Binary stream of the decompressed content of a raw file.
+    """
+    return gzip.open(fname, 'rb') if fname.endswith('.gz') else open(fname, 'rb')
+
+def _hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _read_block(f, blocksize, offset=None):
+    """ Read a full block, gzip streams may return less bytes than requested.
+    """
+    if offset is not None:
+        f.seek(offset)
+    chunks, n = [], 0
+    while n < blocksize:
+        chunk = f.read(blocksize - n)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        n += len(chunk)
+    return b"".join(chunks)
+
+def raw_blocks(fname: str, blocksize: int = 2**20) -> (list[str], int):
+    """
+    Hashes of the fixed-size blocks of the content of a raw file.
+
+    Parameters
+    ----------
+    fname: str
+        Path of the raw file, gzip compressed if it ends with '.gz'.
+    blocksize: int
+        Size of the blocks in bytes. The default is 1 MiB.
+
+    Returns
+    -------
+    hashes: list of str
+        Hashes of the blocks, the last block may be shorter.
+    length: int
+        Length of the (decompressed) content in bytes.
+    """
+    hashes, length = [], 0
+    with _open(fname) as f:
+        for block in iter(lambda: _read_block(f, blocksize), b""):
+            hashes.append(_hash(block))
+            length += len(block)
+    return hashes, length
+
+def adc_blocks(rec_adc, rec_gprmc, blocktime: str = '10min') -> dict:
+    """
+    Hashes of blocks of ADC records keyed by GPS time.
+
+    Parameters
+    ----------
+    rec_adc, rec_gprmc: ndarray, recarray
+        ADC and GPRMC records, see `pyrnet.logger.read_records`.
+    blocktime: str
+        Length of the blocks of GPS time. The default is '10min'.
+
+    Returns
+    -------
+    dict
+        Hash of the ADC records of each block by the start of the block (ISO format).
+    """
+    if rec_adc.shape[0] == 0 or rec_gprmc.size == 0:
+        return {}
+    width = pd.to_timedelta(blocktime) // pd.Timedelta(1, 'ms')
+    key = rec_gprmc.time.astype('datetime64[ms]').astype(np.int64) // width
+    first = np.flatnonzero(np.diff(key, prepend=key[0] - 1))
+    split = np.append(rec_gprmc.iadc[first].astype(np.int64), rec_adc.shape[0])
+    starts = (key[first] * width).astype('datetime64[ms]')
+    return {
+        np.datetime_as_string(t, unit='s'): _hash(np.ascontiguousarray(rec_adc[s0:s1]).tobytes())
+        for t, s0, s1 in zip(starts, split[:-1], split[1:])
+    }
+
+# %% ../../nbs/pyrnet/dedup.ipynb 8
+_dedup_schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    length INTEGER,
+    head TEXT,
+    blocksize INTEGER,
+    blocktime TEXT
+);
+CREATE TABLE IF NOT EXISTS raw_blocks (
+    path TEXT,
+    iblock INTEGER,
+    hash TEXT
+);
+CREATE TABLE IF NOT EXISTS adc_blocks (
+    path TEXT,
+    time TEXT,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_head ON files (head);
+CREATE INDEX IF NOT EXISTS idx_raw_path ON raw_blocks (path, iblock);
+CREATE INDEX IF NOT EXISTS idx_adc_path ON adc_blocks (path, time);
+CREATE INDEX IF NOT EXISTS idx_adc_hash ON adc_blocks (hash, time);
+"""
+# size of the head of the files [bytes] to find candidates of duplicates and prefixes
+_headsize = 4096
+
+def index_files(fnames: list[str],
+                db: str,
+                *,
+                blocksize: int = 2**20,
+                blocktime: str|None = None,
+                date_of_measure: np.datetime64 = np.datetime64('now')) -> dict:
+    """
+    Index (or update the index of) raw files into a SQLite database.
+
+    Parameters
+    ----------
+    fnames: list of str
+        Paths of the raw files.
+    db: str
+        Path of the SQLite database file. Created if it not exists.
+    blocksize: int
+        Size of the raw blocks in bytes. The default is 1 MiB.
+    blocktime: str or None
+        Length of the ADC blocks, e.g. '10min'. If None (default), the files are not parsed and only raw blocks are indexed.
+    date_of_measure: numpy.datetime64
+        Date of measurement to account for gps rollover, see `pyrnet.logger.read_records`.
+
+    Returns
+    -------
+    dict
+        Number of 'indexed' and 'unchanged' files.
+    """
+    stats = {"indexed": 0, "unchanged": 0}
+    with closing(sqlite3.connect(db)) as con, con:
+        con.executescript(_dedup_schema)
+        for fname in fnames:
+            path = os.path.abspath(fname)
+            stat = os.stat(path)
+            known = con.execute("SELECT mtime, size, blocksize, blocktime FROM files WHERE path=?", (path,)).fetchone()
+            if known is not None and known[:3] == (stat.st_mtime, stat.st_size, blocksize) \
+                    and (blocktime is None or known[3] == blocktime):
+                stats["unchanged"] += 1
+                continue
+            hashes, length = raw_blocks(path, blocksize)
+            with _open(path) as f:
+                head = _hash(_read_block(f, _headsize))
+            con.execute("DELETE FROM raw_blocks WHERE path=?", (path,))
+            con.executemany("INSERT INTO raw_blocks VALUES (?,?,?)", [(path, i, h) for i, h in enumerate(hashes)])
+            ftime = blocktime
+            if ftime is not None:
+                rec_adc, rec_gprmc = pyrlogger.read_records(path, date_of_measure=date_of_measure)
+                blocks = {} if type(rec_adc) == bool else adc_blocks(rec_adc, rec_gprmc, ftime)
+                con.execute("DELETE FROM adc_blocks WHERE path=?", (path,))
+                con.executemany("INSERT INTO adc_blocks VALUES (?,?,?)", [(path, t, h) for t, h in blocks.items()])
+            elif known is not None and known[:2] == (stat.st_mtime, stat.st_size):
+                # file is unchanged, keep the ADC blocks
+                ftime = known[3]
+            else:
+                con.execute("DELETE FROM adc_blocks WHERE path=?", (path,))
+            con.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?)",
+                        (path, stat.st_mtime, stat.st_size, length, head, blocksize, ftime))
+            stats["indexed"] += 1
+    logger.info(f"Indexed raw files to {db}: {stats}")
+    return stats
+
+# %% ../../nbs/pyrnet/dedup.ipynb 10
+def _raw_hashes(con, path):
+    return [h for h, in con.execute("SELECT hash FROM raw_blocks WHERE path=? ORDER BY iblock", (path,))]
+
+def _adc_hashes(con, path):
+    return dict(con.execute("SELECT time, hash FROM adc_blocks WHERE path=? ORDER BY time", (path,)))
+
+def _same_bytes(a, b, offset, n):
+    """ Compare *n* bytes at *offset* of the content of two files.
+    """
+    with _open(a) as fa, _open(b) as fb:
+        return _read_block(fa, n, offset) == _read_block(fb, n, offset)
+
+def find_duplicates(fnames: list[str], db: str) -> pd.DataFrame:
+    """
+    Find indexed files, which contain the data of raw files.
+
+    Parameters
+    ----------
+    fnames: list of str
+        Paths of the raw files, indexed with `index_files`.
+    db: str
+        Path of the SQLite database.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per pair of 'file' and 'other' file with the 'relation' ('duplicate', 'prefix' or 'overlap'),
+        the 'fraction' of the complete ADC blocks of file found in other (NaN if not parsed),
+        the GPS time of the first and last shared ADC block 'start' and 'end', and if the file is 'contained' in other.
+    """
+    columns = ["file", "other", "relation", "fraction", "start", "end", "contained"]
+    rows = []
+    with closing(sqlite3.connect(db)) as con:
+        con.executescript(_dedup_schema)
+        for fname in fnames:
+            path = os.path.abspath(fname)
+            known = con.execute("SELECT length, head, blocksize FROM files WHERE path=?", (path,)).fetchone()
+            if known is None:
+                logger.warning(f"{fname} is not indexed. Skip.")
+                continue
+            length, head, blocksize = known
+            blocks = _adc_hashes(con, path)
+            inner = list(blocks)[1:-1] if len(blocks) > 2 else list(blocks)
+
+            # 1. duplicates and prefixes, the head of the content is equal
+            hashes = _raw_hashes(con, path)
+            nfull = length // blocksize
+            found = set()
+            for other, olength in con.execute(
+                    "SELECT path, length FROM files WHERE head=? AND blocksize=? AND path!=? AND length>=?",
+                    (head, blocksize, path, length)).fetchall():
+                ohashes = _raw_hashes(con, other)
+                if olength == length and ohashes == hashes:
+                    relation = "duplicate"
+                elif olength > length and ohashes[:nfull] == hashes[:nfull] and \
+                        (length == nfull*blocksize or _same_bytes(path, other, nfull*blocksize, length - nfull*blocksize)):
+                    relation = "prefix"
+                else:
+                    continue
+                found.add(other)
+                rows.append((path, other, relation, 1. if len(blocks) else np.nan,
+                             min(blocks, default=None), max(blocks, default=None), True))
+
+            # 2. overlaps of ADC blocks
+            if len(blocks) == 0:
+                continue
+            others = [p for p, in con.execute(
+                "SELECT DISTINCT b.path FROM adc_blocks a JOIN adc_blocks b ON a.hash=b.hash AND a.time=b.time "
+                "WHERE a.path=? AND b.path!=?", (path, path))]
+            for other in others:
+                if other in found:
+                    continue
+                oblocks = _adc_hashes(con, other)
+                shared = [t for t, h in blocks.items() if oblocks.get(t, None) == h]
+                tmin, tmax = min(oblocks), max(oblocks)
+                # incomplete first and last blocks within the time range of other
+                edges = [t for t in {min(blocks), max(blocks)} if tmin < t < tmax]
+                contained = set(blocks) <= set(shared) | set(edges)
+                fraction = len(set(inner) & set(shared))/len(inner)
+                rows.append((path, other, "overlap", fraction, shared[0], shared[-1], contained))
+    return pd.DataFrame(rows, columns=columns)
+
+def redundant_files(duplicates: pd.DataFrame, fnames: list[str]) -> list[str]:
+    """
+    Files, which can be skipped, as they are contained in another file of *fnames*.
+
+    Of files containing each other (e.g. duplicates) the first in *fnames* is kept.
+
+    Parameters
+    ----------
+    duplicates: pd.DataFrame
+        Output of `find_duplicates`.
+    fnames: list of str
+        Paths of the raw files to process.
+
+    Returns
+    -------
+    list of str
+        Absolute paths of the redundant files.
+    """
+    order = {os.path.abspath(fn): i for i, fn in enumerate(fnames)}
+    contained = duplicates[duplicates.contained]
+    pairs = set(zip(contained.file, contained.other))
+    skip = []
+    for path in order:
+        for other in contained.other[contained.file == path]:
+            if other not in order or other in skip:
+                continue
+            if (other, path) not in pairs or order[other] < order[path]:
+                skip.append(path)
+                break
+    return skip
@@ -0,0 +1,148 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/instrument.ipynb.
+
+# %% auto 0
+__all__ = ['record', 'stage', 'timed', 'summarize', 'write_jsonl']
+
+# %% ../../nbs/pyrnet/instrument.ipynb 2
+import json
+import time
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_state = ContextVar("pyrnet_instrument", default=None)
+
+# %% ../../nbs/pyrnet/instrument.ipynb 5
+@contextmanager
+def record(memory: bool = True):
+    """
+    Record statistics of all stages run inside of this context.
+
+    Parameters
+    ----------
+    memory: bool
+        Trace the peak of allocated memory with tracemalloc. This slows down the processing. The default is True.
+
+    Yields
+    ------
+    list of dict
+        Statistics of the finished stages in order of completion, with keys 'stage', 'depth' (nesting level),
+        'wall_s', 'cpu_s' and 'peak_mem_bytes' (peak above the memory allocated at the start of the stage, None without *memory*).
+    """
+    stats = []
+    trace = memory and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    token = _state.set({"stats": stats, "stack": [], "memory": memory})
+    try:
+        yield stats
+    finally:
+        _state.reset(token)
+        if trace:
+            tracemalloc.stop()
+
+@contextmanager
+def stage(name: str, **info):
+    """
+    Named processing stage, recorded if run inside of a `record` context.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage.
+    info:
+        Additional items stored with the statistics of the stage.
+    """
+    state = _state.get()
+    if state is None:
+        yield
+        return
+
+    stack = state["stack"]
+    memory = state["memory"] and tracemalloc.is_tracing()
+    entry = {"stage": name, "depth": len(stack), **info}
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # keep the peak of the enclosing stage before resetting
+        if len(stack) > 0:
+            stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+        tracemalloc.reset_peak()
+        entry.update(_start=current, _peak=current)
+    stack.append(entry)
+    t0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        stack.pop()
+        peak_mem = None
+        if memory:
+            peak = max(entry.pop("_peak"), tracemalloc.get_traced_memory()[1])
+            peak_mem = peak - entry.pop("_start")
+            if len(stack) > 0:
+                stack[-1]["_peak"] = max(stack[-1]["_peak"], peak)
+        entry.update(wall_s=wall, cpu_s=cpu, peak_mem_bytes=peak_mem)
+        state["stats"].append(entry)
+
+def timed(name: str|None = None):
+    """
+    Decorator to run a function as a `stage`.
+
+    Parameters
+    ----------
+    name: str or None
+        Name of the stage. If None, the name of the function is used.
+    """
+    def decorator(func):
+        sname = func.__name__ if name is None else name
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _state.get() is None:
+                return func(*args, **kwargs)
+            with stage(sname):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# %% ../../nbs/pyrnet/instrument.ipynb 7
+def summarize(stats: list[dict]) -> dict:
+    """
+    Aggregate the statistics by stage.
+
+    Parameters
+    ----------
+    stats: list of dict
+        Statistics yielded by `record`.
+
+    Returns
+    -------
+    dict
+        Number of 'calls', total 'wall_s' and 'cpu_s', and maximum 'peak_mem_bytes' per stage.
+    """
+    summary = {}
+    for s in stats:
+        agg = summary.setdefault(s["stage"], {"calls": 0, "wall_s": 0., "cpu_s": 0., "peak_mem_bytes": None})
+        agg["calls"] += 1
+        agg["wall_s"] += s["wall_s"]
+        agg["cpu_s"] += s["cpu_s"]
+        if s["peak_mem_bytes"] is not None:
+            agg["peak_mem_bytes"] = max(agg["peak_mem_bytes"] or 0, s["peak_mem_bytes"])
+    return summary
+
+def write_jsonl(stats: list[dict], fname: str, **info):
+    """
+    Append the statistics to a JSON lines file, one line per stage.
+
+    Parameters
+    ----------
+    stats: list of dict
+        Statistics yielded by `record`.
+    fname: str
+        Path of the JSON lines file.
+    info:
+        Additional items stored in every line, e.g., the processed file name.
+    """
+    with open(fname, "a") as f:
+        for s in stats:
+            f.write(json.dumps({**info, **s}, default=str) + "\n")
@@ -1,8 +1,8 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/logger.ipynb.
 
 # %% auto 0
-__all__ = ['logger', 'dtype_gprmc', 'parse_gprmc', 'parse_adc', 'read_records', 'get_adc_time', 'sync_adc_time', 'adc_binning',
-           'resample_mean', 'interpolate_coords']
+__all__ = ['logger', 'dtype_gprmc', 'dtype_segment', 'parse_gprmc', 'parse_adc', 'read_records', 'get_adc_time', 'fit_segments',
+           'sync_adc_time', 'read_segments', 'adc_binning', 'resample_mean', 'interpolate_coords']
 
 # %% ../../nbs/pyrnet/logger.ipynb 2
 from numpy.typing import NDArray,ArrayLike
@@ -10,18 +10,11 @@ import re
 import gzip
 import numpy as np
 import pandas as pd
-from scipy.stats import linregress
 import logging
 
 from . import utils
+from . import instrument
 
-# logging setup
-logging.basicConfig(
-    filename='pyrnet.log',
-    encoding='utf-8',
-    level=logging.DEBUG,
-    format='%(asctime)s %(name)s %(levelname)s:%(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -109,27 +102,9 @@ dtype_gprmc = [
     ( 'iadc',   'u4' )
 ]
 
-def read_records(fname: str,
-                 date_of_measure: np.datetime64 = np.datetime64('now')) -> (NDArray, NDArray):
-    '''
-    Read the GPRMC and ADC records from the pyranometer logger files
-
-    Parameters
-    ----------
-    fname: string
-        The filename of the logger file
-    date_of_measure: numpy.datetime64
-        Date of measurement to account for gps rollover
-
-    Returns
-    -------
-    rec_adc: ndarray
-        The 10bit ADC readings
-    rec_gprmc: recarray
-        The GPRMC GPS records
-    '''
-    logger.info(f"Start reading records from file: {fname}")
-    date_of_measure = utils.to_datetime64(date_of_measure)
+def _read_lines(fname):
+    """ Read and clean up the lines of a logger file, None if the file is almost empty.
+    """
     # Read file, use errors='ignore' to skip non UTF-8 characters
     # non UTF-8 characters may arise in broken GPS strings from time to time
     if fname[-3:]=='.gz':
@@ -142,16 +117,24 @@ def read_records(fname: str,
     ##- skip almost empty files
     if len(lines)<20:
         logger.info("Skip file, as number of records is < 20.")
-        return False,False
+        return None
 
     # remove last line -> mostly damaged or empty
     lines=lines[:-1]
     # remove gps line at the end -> else processing issues
     if _re_gprmc.match(lines[-1]):
         lines=lines[:-1]
+    return lines
 
+def _parse_records(lines, date_of_measure):
+    """ Parse ADC and GPRMC records of the lines of a logger file.
+    Additionally returns the number of ADC and GPRMC records before each header written again by the logger,
+    and the number of ADC records before each line, which is not parsed (see `_line_counts`).
+    """
     rec_gprmc = []
     rec_adc = []
+    headers = []
+    events = {"gps_void": [], "incomplete": [], "unknown": [], "headers": []}
     iadc = 0
     for i,l in enumerate(lines):
         m = _re_gprmc.match(l)
@@ -160,6 +143,9 @@ def read_records(fname: str,
             if not np.isnat(r[0]):
                 # add number of adc values before GPS line
                 rec_gprmc.append(r+(iadc,))
+            else:
+                # no GPS fix
+                events["gps_void"].append(iadc)
         elif _re_adc.match(l):
             r = parse_adc(l)
             if iadc==0:
@@ -169,15 +155,66 @@ def read_records(fname: str,
             if len(r)==adc_len:
                 rec_adc.append(r)
                 iadc += 1
+            else:
+                events["incomplete"].append(iadc)
+        elif l.startswith('#'):
+            # header is written again after a restart of the logger
+            if iadc>0 and (len(headers)==0 or headers[-1][0]<iadc):
+                headers.append((iadc, len(rec_gprmc)))
+                events["headers"].append(iadc)
         else:
             # unhandled record...
-            pass
+            events["unknown"].append(iadc)
     rec_adc   = np.array(rec_adc,dtype=np.uint16)
     rec_gprmc = np.array(rec_gprmc,dtype=dtype_gprmc).view(np.recarray)
+    events = {k: np.array(v, dtype=np.int64) for k, v in events.items()}
+    return rec_adc, rec_gprmc, headers, events
+
+def _line_counts(events, start=0, stop=None):
+    """ Number of GPRMC lines without fix ('gps_void'), dropped incomplete ADC lines ('incomplete'),
+    unhandled lines ('unknown') and headers written again ('headers') between ADC records *start* and *stop*.
+    """
+    stop = np.iinfo(np.int64).max if stop is None else stop
+    return {k: int(np.count_nonzero((v >= start) & (v < stop))) for k, v in events.items()}
+
+@instrument.timed()
+def read_records(fname: str,
+                 date_of_measure: np.datetime64 = np.datetime64('now'),
+                 *,
+                 counts: dict|None = None) -> (NDArray, NDArray):
+    '''
+    Read the GPRMC and ADC records from the pyranometer logger files
+
+    Parameters
+    ----------
+    fname: string
+        The filename of the logger file
+    date_of_measure: numpy.datetime64
+        Date of measurement to account for gps rollover
+    counts: dict or None
+        If given, updated with the number of lines, which are not parsed to records:
+        GPRMC lines without GPS fix 'gps_void', incomplete ADC lines 'incomplete',
+        unhandled lines 'unknown' and headers written again after a restart 'headers'.
+
+    Returns
+    -------
+    rec_adc: ndarray
+        The 10bit ADC readings
+    rec_gprmc: recarray
+        The GPRMC GPS records
+    '''
+    logger.info(f"Start reading records from file: {fname}")
+    date_of_measure = utils.to_datetime64(date_of_measure)
+    lines = _read_lines(fname)
+    if lines is None:
+        return False,False
+    rec_adc, rec_gprmc, _, events = _parse_records(lines, date_of_measure)
+    if counts is not None:
+        counts.update(_line_counts(events))
     logger.info("Done reading records from raw file.")
     return rec_adc, rec_gprmc
 
-# %% ../../nbs/pyrnet/logger.ipynb 20
+# %% ../../nbs/pyrnet/logger.ipynb 23
 def get_adc_time(rec_adc):
     """
     Get Milliseconds from Start of ADC measurement.
@@ -202,8 +239,118 @@ def get_adc_time(rec_adc):
     ta[1:] = np.cumsum(dt)
     return ta
 
-# %% ../../nbs/pyrnet/logger.ipynb 24
-def sync_adc_time(adctime, gpstime, iadc):
+# %% ../../nbs/pyrnet/logger.ipynb 28
+dtype_segment = [
+    ( 'start',  'i8' ),
+    ( 'stop',   'i8' ),
+    ( 'slope',  'f8' ),
+    ( 'offset', 'f8' ),
+    ( 'drift',  'f8' ),
+    ( 'jitter', 'f8' )
+]
+
+def _fit_segments(x, y, starts):
+    """ Least squares fit y=slope*x+offset for each segment of x and y, split at *starts*.
+    """
+    n = np.diff(np.append(starts, x.size))
+    seg = np.repeat(np.arange(starts.size), n)
+    # relative to the segment start for numerical stability
+    x0, y0 = x[starts], y[starts]
+    dx = x - x0[seg]
+    dy = y - y0[seg]
+    sx = np.add.reduceat(dx, starts)
+    sy = np.add.reduceat(dy, starts)
+    sxx = np.add.reduceat(dx*dx, starts)
+    sxy = np.add.reduceat(dx*dy, starts)
+    den = n*sxx - sx**2
+    # single records are assumed to have no drift
+    slope = np.divide(n*sxy - sx*sy, den, out=np.ones(starts.size), where=den > 0)
+    offset = (sy - slope*sx)/n + y0 - slope*x0
+    residual = y - (slope[seg]*x + offset[seg])
+    jitter = np.sqrt(np.bincount(seg, weights=residual**2)/n)
+    rec = np.zeros(starts.size, dtype=dtype_segment).view(np.recarray)
+    rec.start = starts
+    rec.stop = starts + n
+    rec.slope = slope
+    rec.offset = offset
+    rec.drift = (1/slope-1)*86400
+    rec.jitter = jitter
+    return rec
+
+def _restarts(t1, t2, maxstep):
+    """ Index of the first GPS record after a restart, i.e. ADC and GPS clock advance differently between two GPS records.
+    """
+    step = np.diff(t2) - np.diff(t1)
+    jump = np.abs(step) > maxstep
+    # single broken GPS records jump and return
+    outlier = np.abs(step[:-1] + step[1:]) <= maxstep
+    jump[:-1] &= ~outlier
+    jump[1:] &= ~outlier
+    return np.flatnonzero(jump) + 1
+
+def _split_samples(dt, iadc, starts):
+    """ Index of the first ADC sample of each segment of GPS records starting at *starts*, and the number of samples.
+    ADC samples between two segments are split at the most irregular sample interval, e.g. a restart.
+    The last GPS record before a restart may be already assigned to the next ADC sample after the restart.
+    """
+    stops = np.append(starts[1:], iadc.size)
+    first = iadc[starts]
+    last = iadc[np.maximum(stops-2, starts)]
+    split = np.concatenate(([0], first[1:], [dt.size]))
+    if starts.size > 1:
+        nominal = np.median(np.diff(dt[:10000]))
+        for i in range(1, starts.size):
+            gap = np.diff(dt[last[i-1]:first[i]+1])
+            if gap.size > 0:
+                split[i] = last[i-1] + np.argmax(np.abs(gap - nominal)) + 1
+    return split
+
+def fit_segments(t1, t2, maxstep=2000., window=86400000., tolerance=0.5):
+    """
+    Split GPS records at logger restarts and drift changes and fit a line to each segment.
+
+    Parameters
+    ----------
+    t1: ndarray
+        ADC milliseconds of the GPS records.
+    t2: ndarray
+        GPS milliseconds of the GPS records.
+    maxstep: float
+        Maximum difference [ms] of ADC and GPS time between two GPS records. Larger differences
+        are regarded as restart of the logger. The default is 2000, corrupted millisecond counters shift the ADC time by a second.
+    window: float
+        Length [ms] of the GPS time windows, to detect changes of the drift. The default is one day.
+    tolerance: float
+        Maximum difference [s/day] of the drift of adjacent windows. The default is 0.5.
+
+    Returns
+    -------
+    recarray
+        Segments with index of the first GPS record 'start', the stop index 'stop', 'slope' and 'offset'
+        of the fit, the clock 'drift' [s/day] and the standard deviation of the residuals 'jitter' [ms].
+    """
+    t1 = np.asarray(t1, dtype=np.float64)
+    t2 = np.asarray(t2, dtype=np.float64)
+    # 1. restarts
+    restarts = np.append(0, _restarts(t1, t2, maxstep))
+    seg = np.repeat(np.arange(restarts.size), np.diff(np.append(restarts, t1.size)))
+    # 2. windows of GPS time in each segment
+    iwin = np.floor((t2 - t2[restarts][seg])/window).astype(np.int64)
+    starts = np.flatnonzero(np.diff(seg, prepend=-1) | np.diff(iwin, prepend=-1))
+    # merge short windows (e.g. at the end of a segment) with the previous window
+    stops = np.append(starts[1:], t1.size) - 1
+    short = (t2[stops] - t2[starts]) < window/2
+    short &= np.isin(starts, restarts, invert=True)
+    starts = starts[~short]
+    # 3. new segment, if the drift changes between two windows
+    windows = _fit_segments(t1, t2, starts)
+    change = np.abs(np.diff(windows.drift, prepend=np.nan)) > tolerance
+    starts = starts[np.isin(starts, restarts) | change]
+    return _fit_segments(t1, t2, starts)
+
+# %% ../../nbs/pyrnet/logger.ipynb 30
+@instrument.timed()
+def sync_adc_time(adctime, gpstime, iadc, *, maxstep=2000., window=86400000., tolerance=0.5):
     '''
     Synchronize the ADC time to the GPS records
 
@@ -215,6 +362,8 @@ def sync_adc_time(adctime, gpstime, iadc):
         GPS time
     iadc: ndarray of int
         Index of the last ADC sample before a GPS record has been stored.
+    maxstep, window, tolerance: float
+        Segmentation of the records, see `fit_segments`.
 
     Returns
     -------
@@ -231,17 +380,81 @@ def sync_adc_time(adctime, gpstime, iadc):
     t1 = ta[iadc]/np.timedelta64(1,'ms')
     # time of GPS records from GPRMC record
     t2 = (gpstime-gpstime[0])/np.timedelta64(1,'ms')
-    a,b = linregress(t1,t2)[:2]
-    t = gpstime[0]+ta*a+b.astype('timedelta64[ms]')
+    segments = fit_segments(t1, t2, maxstep=maxstep, window=window, tolerance=tolerance)
 
+    split = _split_samples(ta/np.timedelta64(1,'ms'), iadc, segments.start)
+    t = np.empty(ta.size, dtype='datetime64[ms]')
     logger.info('Sync ADC time to GPS Fit Summary:')
-    logger.info('|-- Drift  : {0:7.2f} [s/day]'.format( (1/a-1)*86400 ))
-    logger.info('|-- Slope  : {0:13.8f}'.format(a))
-    logger.info('|-- Offset : {0:7.2f} [s]'.format(b/1000))
-    logger.info('|-- Jitter : {0:7.2f} [ms]'.format(np.std(t2-(a*t1+b))))
+    for i, seg in enumerate(segments):
+        a, b = seg['slope'], seg['offset']
+        t[split[i]:split[i+1]] = gpstime[0]+ta[split[i]:split[i+1]]*a+b.astype('timedelta64[ms]')
+        if segments.size > 1:
+            logger.info(f'|-- Segment {i}: {t[split[i]]} - {t[split[i+1]-1]}')
+        logger.info('|-- Drift  : {0:7.2f} [s/day]'.format( seg['drift'] ))
+        logger.info('|-- Slope  : {0:13.8f}'.format(a))
+        logger.info('|-- Offset : {0:7.2f} [s]'.format(b/1000))
+        logger.info('|-- Jitter : {0:7.2f} [ms]'.format(seg['jitter']))
     return t
 
-# %% ../../nbs/pyrnet/logger.ipynb 36
+# %% ../../nbs/pyrnet/logger.ipynb 33
+@instrument.timed()
+def read_segments(fname: str,
+                  date_of_measure: np.datetime64 = np.datetime64('now'),
+                  *,
+                  maxstep: float = 2000.) -> list:
+    '''
+    Read the GPRMC and ADC records from the pyranometer logger files, split at restarts of the logger.
+
+    Parameters
+    ----------
+    fname: string
+        The filename of the logger file
+    date_of_measure: numpy.datetime64
+        Date of measurement to account for gps rollover
+    maxstep: float
+        Maximum difference [ms] of ADC and GPS time between two GPS records, see `fit_segments`.
+        The default is 2000.
+
+    Returns
+    -------
+    list of (ndarray, recarray, dict)
+        The ADC readings, GPRMC records and counts of lines not parsed (see `read_records`) of each segment.
+    '''
+    logger.info(f"Start reading segments from file: {fname}")
+    date_of_measure = utils.to_datetime64(date_of_measure)
+    lines = _read_lines(fname)
+    if lines is None:
+        return []
+    rec_adc, rec_gprmc, headers, events = _parse_records(lines, date_of_measure)
+    if rec_adc.shape[0] == 0 or rec_gprmc.size == 0:
+        return [(rec_adc, rec_gprmc, _line_counts(events))]
+
+    # segment boundaries as (first ADC sample, first GPS record)
+    bounds = set(headers)
+    # jumps of GPS time, the ADC time is not reliable at restarts
+    ta = get_adc_time(rec_adc)/np.timedelta64(1,'ms')
+    iadc = rec_gprmc.iadc.astype(int)
+    t2 = (rec_gprmc.time-rec_gprmc.time[0])/np.timedelta64(1,'ms')
+    starts = np.append(0, _restarts(ta[np.minimum(iadc, ta.size-1)], t2, maxstep))
+    split = _split_samples(ta, np.minimum(iadc, ta.size-1), starts)
+    bounds.update(zip(split[1:-1], starts[1:]))
+    bounds = sorted(bounds | {(0, 0), (rec_adc.shape[0], rec_gprmc.size)})
+
+    segments = []
+    for (s0, r0), (s1, r1) in zip(bounds[:-1], bounds[1:]):
+        gprmc = rec_gprmc[r0:r1]
+        # GPS records assigned to ADC samples of the neighbouring segment
+        gprmc = gprmc[(gprmc.iadc >= s0) & (gprmc.iadc < s1)].copy()
+        gprmc.iadc -= np.uint32(s0)
+        if s1 <= s0 or gprmc.size == 0:
+            continue
+        # lines before the first and after the last ADC record belong to the first and last segment
+        counts = _line_counts(events, s0, None if s1 == rec_adc.shape[0] else s1)
+        segments.append((rec_adc[s0:s1], gprmc, counts))
+    logger.info(f"Done reading {len(segments)} segments from raw file.")
+    return segments
+
+# %% ../../nbs/pyrnet/logger.ipynb 45
 def adc_binning(rec_adc, time, bins=86400):
     """
     Binning and averaging of ADC samples
@@ -283,8 +496,28 @@ def adc_binning(rec_adc, time, bins=86400):
     logger.info(f"ADC records span a time period from {bintime[0]} to {bintime[-1]}.")
     return V, bintime
 
-# %% ../../nbs/pyrnet/logger.ipynb 38
-def resample_mean(ds,freq='1s'):
+# %% ../../nbs/pyrnet/logger.ipynb 47
+@instrument.timed()
+def resample_mean(ds,freq='1s',*,counts=False):
+    """
+    Resample time dependent variables to bin averages.
+
+    Parameters
+    ----------
+    ds: xr.Dataset
+        Dataset with time dimension 'time'.
+    freq: str
+        Width of the bins. The default is '1s'.
+    counts: bool
+        If True, NaN values are ignored and the number of valid samples of each variable is added as '<var>_count'.
+        Existing counts of the input are used as weights, e.g. to aggregate a resampled dataset again. Empty bins are NaN.
+        The default is False.
+
+    Returns
+    -------
+    xr.Dataset
+        The resampled dataset.
+    """
 
     # start and end bin time
     start_time = np.datetime64(
@@ -317,9 +550,32 @@ def resample_mean(ds,freq='1s'):
                                    return_inverse=True,
                                    return_counts=True)
 
-    # apply to all time dependend variables
+    # apply to all time dependent variables
     for var in ds:
-        if 'time' in ds[var].dims:
+        if counts and var.endswith("_count"):
+            # resampled with the variable
+            continue
+        if counts and 'time' in ds[var].dims:
+            x = ds[var].values.reshape(ds.time.size,-1)
+            w = ds[f"{var}_count"].values.reshape(x.shape) if f"{var}_count" in ds else np.ones(x.shape)
+            w = np.where(np.isnan(x),0,w)
+            n = np.zeros((bintime.size,x.shape[1]))
+            newval = np.zeros(n.shape)
+            for i in range(x.shape[1]):
+                n[:,i] = np.bincount(it,weights=w[:,i],minlength=bintime.size)
+                newval[:,i] = np.bincount(it,weights=np.where(w[:,i]>0,x[:,i],0)*w[:,i],minlength=bintime.size)
+            newval = np.divide(newval,n,out=np.full(n.shape,np.nan),where=n>0)
+            newdims = [d if d!='time' else 'time_resampled' for d in ds[var].dims]
+            newshape = (bintime.size,)+ds[var].shape[1:]
+            ds_r = ds_r.assign({
+                var: (newdims, newval.reshape(newshape)),
+                f"{var}_count": (newdims, n.reshape(newshape).astype(np.uint32), {
+                    "long_name": f"number of valid samples of {var}",
+                    "units": "1",
+                }),
+            })
+            ds_r[f"{var}_count"].encoding.update({"dtype": "u4", "zlib": True})
+        elif 'time' in ds[var].dims:
             # replace time dimension with time_resampled
             vardims = ds[var].dims
             newdims = [d if d!='time' else 'time_resampled' for d in vardims]
@@ -349,7 +605,7 @@ def resample_mean(ds,freq='1s'):
     return ds_r
 
 
-# %% ../../nbs/pyrnet/logger.ipynb 40
+# %% ../../nbs/pyrnet/logger.ipynb 51
 def interpolate_coords(rec_gprmc, time):
     """
     Interpolate lat and lon from gps records
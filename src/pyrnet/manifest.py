@@ -0,0 +1,242 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/manifest.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'MANIFEST_NAME', 'file_digest', 'json_digest', 'file_state', 'l1a_dependencies', 'l1b_dependencies',
+           'read_manifest', 'write_manifest', 'record_output', 'is_up_to_date']
+
+# %% ../../nbs/pyrnet/manifest.ipynb 2
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+import pyrnet as pyrnet_main
+from . import utils as pyrutils
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "pyrnet_manifest.json"
+
+# %% ../../nbs/pyrnet/manifest.ipynb 5
+def file_digest(fname: str, blocksize: int = 2**20) -> str:
+    """ sha256 hex digest of the content of file *fname*.
+    """
+    h = hashlib.sha256()
+    with open(fname, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def json_digest(obj) -> str:
+    """ sha256 hex digest of the json representation of *obj*.
+    """
+    s = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def file_state(fname: str, known: dict|None = None) -> dict:
+    """
+    Size, modification time and sha256 hash of a file.
+
+    Parameters
+    ----------
+    fname: str
+        Path of the file.
+    known: dict or None
+        Previously recorded state of the file. The hash is reused, if size and modification time are unchanged.
+
+    Returns
+    -------
+    dict
+        'size', 'mtime' and 'sha256' of the file.
+    """
+    stat = os.stat(fname)
+    state = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if known is not None and known["size"] == state["size"] and known["mtime"] == state["mtime"]:
+        state["sha256"] = known["sha256"]
+    else:
+        state["sha256"] = file_digest(fname)
+    return state
+
+# %% ../../nbs/pyrnet/manifest.ipynb 7
+def _config_digests(config):
+    """ Digests of the config (without file paths) and the cfmeta file.
+    """
+    return {
+        "config": json_digest({k: v for k, v in config.items() if not k.startswith("file_")}),
+        "cfmeta": file_digest(config["file_cfmeta"]),
+    }
+
+def _campaign_entry(config, key, station):
+    """ Entry of station in a campaign lookup file, e.g. 'sites' or 'gti_angles'.
+    """
+    if config[key] is None:
+        return None
+    return pyrutils.read_json(config[f"file_{key}"])[config[key]].get(f"{station:03d}", None)
+
+def l1a_dependencies(config: dict, station: int, date, report=None) -> dict:
+    """
+    Digests of the dependencies of a l1a output file.
+
+    Parameters
+    ----------
+    config: dict
+        Processing config, see `pyrnet.data.get_config`.
+    station: int
+        PyrNet station number.
+    date: datetime64
+        Date of maintenance, the end of the l1a file.
+    report: dict, pd.DataFrame or None
+        Maintenance report as passed to `pyrnet.data.to_l1a`.
+
+    Returns
+    -------
+    dict
+        Digests by dependency name.
+    """
+    from pyrnet import reports as pyrreports
+    key = f"{station:03d}"
+    if report is None:
+        entry = None
+    elif isinstance(report, dict):
+        entry = report.get(key, None)
+    else:
+        entry = pyrreports.parse_report(report, date_of_maintenance=date).get(key, None)
+    return {
+        **_config_digests(config),
+        "report": json_digest(entry),
+        "sites": json_digest(_campaign_entry(config, "sites", station)),
+        "gti_angles": json_digest(_campaign_entry(config, "gti_angles", station)),
+    }
+
+def l1b_dependencies(config: dict, station: int, date) -> dict:
+    """
+    Digests of the dependencies of a l1b output file.
+
+    Parameters
+    ----------
+    config: dict
+        Processing config, see `pyrnet.data.get_config`.
+    station: int
+        PyrNet station number.
+    date: datetime64
+        Day of the l1b file.
+
+    Returns
+    -------
+    dict
+        Digests by dependency name.
+    """
+    from pyrnet import pyrnet
+    meta = pyrnet.meta_lookup(
+        pyrutils.to_datetime64(date),
+        box=station,
+        cfile=config['file_calibration'],
+        mapfile=config['file_mapping'],
+    )
+    return {
+        **_config_digests(config),
+        "calibration": json_digest(meta),
+    }
+
+# %% ../../nbs/pyrnet/manifest.ipynb 9
+def read_manifest(path: str) -> dict:
+    """ Read the manifest of the output directory *path*, or an empty manifest if it not exists.
+    """
+    fname = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(fname):
+        return {"outputs": {}}
+    with open(fname, "r") as f:
+        return json.load(f)
+
+def write_manifest(path: str, manifest: dict):
+    """ Write the manifest to the output directory *path*.
+    """
+    fname = os.path.join(path, MANIFEST_NAME)
+    # write to temporary file first, to not break the manifest if interrupted
+    with open(fname + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(fname + ".tmp", fname)
+
+def record_output(manifest: dict,
+                  outfile: str,
+                  *,
+                  inputs: list[str],
+                  dependencies: dict,
+                  station: int,
+                  date) -> dict:
+    """
+    Record an output file to the manifest.
+
+    Parameters
+    ----------
+    manifest: dict
+        Manifest as returned by `read_manifest`.
+    outfile: str
+        Path of the output file, recorded by its file name.
+    inputs: list of str
+        Input files of the output.
+    dependencies: dict
+        Digests of the dependencies, e.g. from `l1a_dependencies`.
+    station: int
+        PyrNet station number.
+    date: datetime64
+        Date to resolve the dependencies of the output.
+
+    Returns
+    -------
+    dict
+        The updated manifest.
+    """
+    known = manifest["outputs"].get(os.path.basename(outfile), {}).get("inputs", {})
+    manifest["outputs"][os.path.basename(outfile)] = {
+        "inputs": {
+            os.path.abspath(fn): file_state(fn, known.get(os.path.abspath(fn), None)) for fn in inputs
+        },
+        "dependencies": dependencies,
+        "station": int(station),
+        "date": str(pyrutils.to_datetime64(date)),
+        "version": pyrnet_main.__version__,
+    }
+    return manifest
+
+def is_up_to_date(manifest: dict, path: str, input_file: str, dependencies) -> bool:
+    """
+    Check if all outputs of an input file are up-to-date.
+
+    Parameters
+    ----------
+    manifest: dict
+        Manifest as returned by `read_manifest`.
+    path: str
+        Output directory of the manifest.
+    input_file: str
+        Path of the input file.
+    dependencies: callable
+        Called with station and date of an output record, returns the current digests of the dependencies.
+
+    Returns
+    -------
+    bool
+        False, if the input file is not recorded, or any of its outputs is missing, was produced
+        with a different pyrnet version, or any of the recorded inputs or dependencies changed.
+    """
+    input_file = os.path.abspath(input_file)
+    records = {k: v for k, v in manifest["outputs"].items() if input_file in v["inputs"]}
+    if len(records) == 0:
+        return False
+    for outfile, rec in records.items():
+        if not os.path.exists(os.path.join(path, outfile)):
+            logger.info(f"{outfile} does not exist.")
+            return False
+        if rec["version"] != pyrnet_main.__version__:
+            logger.info(f"{outfile} was produced by pyrnet version {rec['version']}.")
+            return False
+        for fn, known in rec["inputs"].items():
+            if not os.path.exists(fn) or file_state(fn, known)["sha256"] != known["sha256"]:
+                logger.info(f"Input {fn} of {outfile} changed.")
+                return False
+        if dependencies(rec["station"], np.datetime64(rec["date"])) != rec["dependencies"]:
+            logger.info(f"Dependencies of {outfile} changed.")
+            return False
+    return True
@@ -8,21 +8,17 @@ __all__ = ['campaign_pfx', 'DATA_URL', 'FNAME_FMT_HDCP2', 'SOLCONST', 'MAX_MISSI
 # %% ../../nbs/pyrnet/pyrnet.ipynb 2
 from collections.abc import Iterable
 from xml.dom import minidom
-from urllib.request import urlopen
 import parse
 import os
 import numpy as np
 import pandas as pd
 import xarray as xr
-from scipy.interpolate import interp1d
 from toolz import valfilter, cons, merge, merge_with
-import pkg_resources as pkg_res
 import warnings
 
-# python -m pip install git+https://github.com/hdeneke/trosat-base.git#egg=trosat-base
-from trosat import sunpos as sp
-
 from . import utils as pyrutils
+from . import cache as pyrcache
+from . import catalog as pyrcatalog
 
 # %% ../../nbs/pyrnet/pyrnet.ipynb 5
 # campaign file name map for hdcp2 data
@@ -47,10 +43,8 @@ MIN_GOOD = 85400 # Minimum allowed number of good records
 # %% ../../nbs/pyrnet/pyrnet.ipynb 7
 def get_elements(url, tag_name='dataset', attribute_name='urlPath'):
   """Get elements from an XML file"""
-  # usock = urllib2.urlopen(url)
-  usock = urlopen(url)
-  xmldoc = minidom.parse(usock)
-  usock.close()
+  # requests are served from the local cache, see cache.ipynb
+  xmldoc = minidom.parseString(pyrcache.urlread(url))
   tags = xmldoc.getElementsByTagName(tag_name)
   attributes=[]
   for tag in tags:
@@ -74,11 +68,14 @@ def parse_thredds_catalog(url, fname_format):
             results = merge_with(lambda x: list(cons(x[1],x[0])), results, res.named)
     return pd.DataFrame.from_dict(results)
 
-def lookup_fnames(date, *, station, lvl, campaign, collection):
-    """Parse Thredds server files and return list of filenames matching the date, station, campaign and collection configuration."""
+def lookup_fnames(date, *, station, lvl, campaign, collection, catalog=None):
+    """Parse Thredds server files and return list of filenames matching the date, station, campaign and collection configuration.
+    If *catalog* (path of a local catalog database, see catalog.ipynb) is given, the local archive is looked up instead."""
+    if catalog is not None:
+        return pyrcatalog.lookup_fnames(catalog, date, station=station, lvl=lvl, campaign=campaign, collection=collection)
     date = pyrutils.to_datetime64(date)
 
-    fn = pkg_res.resource_filename("pyrnet", "share/pyrnet_config.json")
+    fn = pyrutils.resource_filename("share/pyrnet_config.json")
     pyrcfg = pyrutils.read_json(fn)
 
     # construct catalog url
@@ -187,7 +184,7 @@ def lookup_fnames(date, *, station, lvl, campaign, collection):
     return fnames
 
 # %% ../../nbs/pyrnet/pyrnet.ipynb 17
-def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None, freq="1s", drop_vars=None):
+def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None, freq="1s", drop_vars=None, catalog=None):
     """
     Read PyrNet data (processed with pyrnet package) from the TROPOS thredds server. Returns one xarray Dataset merged to match the dates and stations input.
     Parameters
@@ -205,7 +202,9 @@ def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None,
     freq: str
         Pandas date frequencey description string. The default is '1s'.
     drop_vars: list of string or None
-        List of variables to drop from datasets to speed up merging process.
+        List of variables to drop from datasets to speed up merging process. Dropped variables are not requested from the server.
+    catalog: str or None
+        Path of a local catalog database (see catalog.ipynb). If given, files are read from the indexed local archive instead of the thredds server. The default is None.
 
     Returns
     -------
@@ -231,7 +230,8 @@ def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None,
                 station=stations,
                 lvl=lvl,
                 campaign=campaign,
-                collection=collection
+                collection=collection,
+                catalog=catalog
             )
         )
     urls = np.unique(fnames)
@@ -241,12 +241,11 @@ def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None,
 
     stations = np.arange(1,101)
     for i,url in enumerate(urls):
-        # read from thredds server
-        dst = xr.open_dataset(url)
-
-        # drop not needed variables
-        if drop_vars is not None:
-            dst = dst.drop_vars(drop_vars)
+        # read from local archive or thredds server (via local cache), drop not needed variables
+        if catalog is not None:
+            dst = xr.open_dataset(url, drop_variables=drop_vars)
+        else:
+            dst = pyrcache.open_dataset(url, drop_vars=drop_vars)
 
         # unify time and station dimension to speed up merging
         date = dst[timevar].values[0].astype("datetime64[D]")
@@ -278,47 +277,65 @@ def read_thredds(dates, *, campaign, stations=None, lvl='l1b', collection=None,
     return ds
 
 # %% ../../nbs/pyrnet/pyrnet.ipynb 20
-def read_hdcp2( dt, fill_gaps=True, campaign='hope_juelich'):
+def read_hdcp2( dt, fill_gaps=True, campaign='hope_juelich', max_gap=None):
     """
     Read HDCP2-formatted datafiles from the pyranometer network
 
     Parameters
     ----------
-    dt: datetime.date
-        The date of the data to read
+    dt: datetime.date or list of datetime.date
+        The date of the data to read. If a list of dates is given, the days are concatenated along time
+        and only stations passing the quality check on all days are kept.
     fill_gaps: bool
         A flag indicating whether gaps should be filled by interpolation
     campaign: str
         specify campaign ['eifel','hope_juelich','hope_melpitz','lindenberg','melcol']
+    max_gap: int or None
+        Maximum number of consecutive missing samples filled by interpolation. If None, all gaps are filled.
 
     Returns
     -------
     dataset : xarray.Dataset
         The pyranometer network observations
     """
-    # load dataset
-    fname = DATA_URL + "old/nc/"+ FNAME_FMT_HDCP2
-    fname = fname.format(dt=dt,
-                         campaign=campaign,
-                         campaign_pfx=campaign_pfx[campaign])
-    ds = xr.open_dataset(fname, mask_and_scale=False)
+    # python -m pip install git+https://github.com/hdeneke/trosat-base.git#egg=trosat-base
+    from trosat import sunpos as sp
 
-    # select good stations
-    igood = (np.sum(ds.rsds.data<-900.0,axis=0)<MAX_MISSING)&(np.sum(ds.rsds_flag==1,axis=0)>MIN_GOOD)
-    ds = ds.isel(nstations=igood)
+    dts = dt if isinstance(dt, Iterable) else [dt]
 
-    # fill gaps if requested
+    # load datasets
+    fname = DATA_URL + "old/nc/"+ FNAME_FMT_HDCP2
+    dsl = [pyrcache.open_dataset(fname.format(dt=day,
+                                              campaign=campaign,
+                                              campaign_pfx=campaign_pfx[campaign]),
+                                 mask_and_scale=False) for day in dts]
+
+    # select stations which are good on all days
+    igood = np.all([
+        (np.sum(dsd.rsds.data<-900.0,axis=0)<MAX_MISSING)&(np.sum(dsd.rsds_flag.data==1,axis=0)>MIN_GOOD)
+        for dsd in dsl
+    ], axis=0)
+    dsl = [dsd.isel(nstations=igood) for dsd in dsl]
+
+    # fill gaps if requested, each day separately, but all stations at once
     if fill_gaps==True:
-        x = (ds.time-ds.time[0])/np.timedelta64(1,'s')
-        for i in np.arange(ds.dims['nstations']):
-            y = ds.rsds.data[:,i]
-            m = y>-990.0
-            if not np.all(m):
-                f = interp1d(x[m],y[m],'linear',bounds_error=False,fill_value='extrapolate')
-                ds.rsds[~m,i]=f(x[~m])
+        for dsd in dsl:
+            x = (dsd.time.data-dsd.time.data[0])/np.timedelta64(1,'s')
+            y = dsd.rsds.data
+            y = pyrutils.fill_gaps(x, y, y>-990.0, max_gap=max_gap)
+            dsd['rsds'] = dsd.rsds.copy(data=y.astype(dsd.rsds.dtype))
+
     # add additional DataArrays
+    esd = [sp.earth_sun_distance((dsd.time.data[0]-np.datetime64(sp.EPOCH_JD2000_0))/np.timedelta64(1,'D')+0.5)
+           for dsd in dsl]
+    if len(dsl)==1:
+        ds = dsl[0]
+        ds['esd'] = esd[0]
+    else:
+        ds = xr.concat(dsl, dim='time', data_vars='minimal')
+        ds['esd'] = xr.DataArray(np.repeat(esd, [dsd.time.size for dsd in dsl]),
+                                 dims=('time',), coords={'time':ds.time.data})
     jd = (ds.time.data-np.datetime64(sp.EPOCH_JD2000_0))/np.timedelta64(1,'D')
-    ds['esd'] = sp.earth_sun_distance(jd[0]+0.5)
     szen = sp.sun_angles(jd[:,None],ds.lat.data[None,:],ds.lon.data[None,:])[0]
     ds['szen']    = xr.DataArray(szen,dims=('time','nstations'),coords={'time':ds.time.data})
     ds['mu0']     = np.cos(np.deg2rad(ds.szen))
@@ -409,9 +426,9 @@ def get_pyrnet_mapping(fn:str, date):
 # %% ../../nbs/pyrnet/pyrnet.ipynb 39
 def meta_lookup(date,*,serial=None,box=None,cfile=None, mapfile=None):
     if cfile is None:
-        cfile = pkg_res.resource_filename("pyrnet", "share/pyrnet_calibration.json")
+        cfile = pyrutils.resource_filename("share/pyrnet_calibration.json")
     if mapfile is None:
-        mapfile = pkg_res.resource_filename("pyrnet", "share/pyrnet_station_map.json")
+        mapfile = pyrutils.resource_filename("share/pyrnet_station_map.json")
 
     map = get_pyrnet_mapping(mapfile,date)
     calib = read_calibration(cfile,date)
@@ -0,0 +1,167 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/quicklook.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'update_quicklook', 'query_quicklook']
+
+# %% ../../nbs/pyrnet/quicklook.ipynb 2
+import os
+import sqlite3
+import logging
+from contextlib import closing
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from . import data as pyrdata
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/quicklook.ipynb 5
+_quicklook_schema = """
+CREATE TABLE IF NOT EXISTS tiles (
+    station INTEGER,
+    variable TEXT,
+    level INTEGER,
+    bucket INTEGER,
+    min REAL,
+    max REAL,
+    sum REAL,
+    count INTEGER,
+    PRIMARY KEY (station, variable, level, bucket)
+);
+CREATE INDEX IF NOT EXISTS tiles_level_bucket ON tiles (level, bucket);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+_quicklook_vars = ["ghi", "gti", "ta", "battery_voltage"]
+_epoch = np.datetime64("1970-01-01T00:00:00", "ns")
+
+def _get_levels(con, config):
+    """ Quicklook levels of the database, set from config for a new database.
+    """
+    levels = [int(lvl) for lvl in config["quicklook_levels"]]
+    minlevel, maxlevel = levels
+    if 86400 % 2**minlevel != 0 or maxlevel < minlevel:
+        raise ValueError(f"Invalid quicklook_levels {levels}, buckets of the finest level have to divide a day (level <= 7).")
+    known = con.execute("SELECT value FROM meta WHERE key='levels'").fetchone()
+    if known is None:
+        con.execute("INSERT INTO meta VALUES ('levels', ?)", (f"{minlevel} {maxlevel}",))
+        return minlevel, maxlevel
+    return tuple(int(lvl) for lvl in known[0].split())
+
+def update_quicklook(ds: xr.Dataset, db: str, *, config: dict|None = None) -> dict:
+    """
+    Update the quicklook tiles of a SQLite database with a l1b Dataset.
+
+    The tiles of the stations of the Dataset in the time range of the Dataset are replaced,
+    hence, update with complete (daily) l1b files.
+
+    Parameters
+    ----------
+    ds: xr.Dataset
+        l1b Dataset of a station or the network.
+    db: str
+        Path of the SQLite database file. Created if it not exists.
+    config: dict or None
+        Config to override the default config, providing the 'quicklook_levels' of a new database.
+
+    Returns
+    -------
+    dict
+        Number of 'stations' and of 'tiles' of the finest level.
+    """
+    config = pyrdata.get_config(config)
+    variables = [var for var in _quicklook_vars if var in ds]
+    seconds = (ds.time.values - _epoch) // np.timedelta64(1, 's')
+    stats = {"stations": 0, "tiles": 0}
+    with closing(sqlite3.connect(db)) as con, con:
+        con.executescript(_quicklook_schema)
+        minlevel, maxlevel = _get_levels(con, config)
+        bucket = seconds // 2**minlevel
+        for station in ds.station.values:
+            station = int(station)
+            dst = ds.sel(station=station)
+            df = pd.DataFrame({var: dst[var].values for var in variables})
+            df = df.groupby(bucket).agg(["min", "max", "sum", "count"])
+            rows = []
+            for var in variables:
+                dfv = df[var][df[var]["count"] > 0]
+                rows += [(station, var, minlevel, int(b), float(vmin), float(vmax), float(vsum), int(n))
+                         for b, (vmin, vmax, vsum, n) in zip(dfv.index, dfv.itertuples(index=False))]
+            lo, hi = int(bucket[0]), int(bucket[-1])
+            con.execute("DELETE FROM tiles WHERE station=? AND level=? AND bucket BETWEEN ? AND ?",
+                        (station, minlevel, lo, hi))
+            con.executemany("INSERT INTO tiles VALUES (?,?,?,?,?,?,?,?)", rows)
+            # aggregate the parents of the replaced buckets
+            for level in range(minlevel + 1, maxlevel + 1):
+                lo, hi = lo // 2, hi // 2
+                con.execute("DELETE FROM tiles WHERE station=? AND level=? AND bucket BETWEEN ? AND ?",
+                            (station, level, lo, hi))
+                con.execute(
+                    "INSERT INTO tiles SELECT station, variable, ?, bucket / 2, MIN(min), MAX(max), SUM(sum), SUM(count) "
+                    "FROM tiles WHERE station=? AND level=? AND bucket BETWEEN ? AND ? GROUP BY variable, bucket / 2",
+                    (level, station, level - 1, 2 * lo, 2 * hi + 1))
+            stats["stations"] += 1
+            stats["tiles"] += len(rows)
+    logger.info(f"Updated quicklook {db}: {stats}")
+    return stats
+
+# %% ../../nbs/pyrnet/quicklook.ipynb 7
+def query_quicklook(db: str,
+                    start: np.datetime64,
+                    end: np.datetime64,
+                    width: int = 1000,
+                    *,
+                    stations: list[int]|None = None,
+                    variables: list[str]|None = None) -> pd.DataFrame:
+    """
+    Quicklook tiles of a time range, at the level matching the width of a plot.
+
+    Parameters
+    ----------
+    db: str
+        Path of the SQLite database file.
+    start, end: numpy.datetime64
+        Time range of the plot.
+    width: int
+        Width of the plot in pixels. The finest level with at most one bucket per pixel is returned,
+        limited to the levels of the database. The default is 1000.
+    stations: list of int or None
+        Stations to return. If None (default), all stations are returned.
+    variables: list of str or None
+        Variables to return, any of 'ghi', 'gti', 'ta', 'battery_voltage'. If None (default), all variables are returned.
+
+    Returns
+    -------
+    pd.DataFrame
+        'time' (start of the bucket), 'station', 'variable', 'min', 'max', 'mean' and 'count' of the tiles.
+        The width of the buckets is stored as attribute 'resolution'.
+    """
+    start = np.datetime64(start, "ns")
+    end = np.datetime64(end, "ns")
+    if end <= start:
+        raise ValueError("End of the time range has to be later than start.")
+    if not os.path.exists(db):
+        raise ValueError(f"{db} does not exist.")
+    with closing(sqlite3.connect(db)) as con:
+        known = con.execute("SELECT value FROM meta WHERE key='levels'").fetchone()
+        if known is None:
+            raise ValueError(f"{db} is not a quicklook database.")
+        minlevel, maxlevel = (int(lvl) for lvl in known[0].split())
+        seconds = (end - start) / np.timedelta64(1, 's') / width
+        level = int(np.clip(np.ceil(np.log2(max(seconds, 1.))), minlevel, maxlevel))
+        lo = ((start - _epoch) // np.timedelta64(1, 's')) // 2**level
+        hi = ((end - _epoch) // np.timedelta64(1, 's')) // 2**level
+        sql = "SELECT bucket, station, variable, min, max, sum, count FROM tiles WHERE level=? AND bucket BETWEEN ? AND ?"
+        args = [level, int(lo), int(hi)]
+        for key, values in [("station", stations), ("variable", variables)]:
+            if values is not None:
+                sql += f" AND {key} IN ({','.join('?' * len(values))})"
+                args += list(values)
+        df = pd.read_sql_query(sql + " ORDER BY station, variable, bucket", con, params=args)
+    df.insert(0, "time", _epoch + df.pop("bucket").values * np.timedelta64(2**level, 's'))
+    df.insert(5, "mean", df.pop("sum") / df["count"])
+    df.attrs["resolution"] = pd.to_timedelta(2**level, 's')
+    return df
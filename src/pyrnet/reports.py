@@ -1,7 +1,7 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/reports.ipynb.
 
 # %% auto 0
-__all__ = ['get_responses', 'read_logbook', 'parse_legacy_logbook', 'parse_report', 'get_qcflag']
+__all__ = ['get_responses', 'read_logbook', 'parse_legacy_logbook', 'index_report', 'parse_report', 'get_qcflag']
 
 # %% ../../nbs/pyrnet/reports.ipynb 2
 import pandas as pd
@@ -11,7 +11,6 @@ from pandas._typing import (
 )
 import datetime as dt
 import numpy as np
-from toolz import assoc_in
 
 from . import utils
 
@@ -74,6 +73,67 @@ def get_responses(
     return df
 
 # %% ../../nbs/pyrnet/reports.ipynb 12
+_logbook_dtype = [
+    ('box',         np.uint8),
+    ('site',        'U50'),
+    ('serial_pyr',  'U50'),
+    ('serial_pyr_tilt', 'U50'),
+    ('user',          'U50'),
+    ('campaign',    'U50'),
+    ('date',        'datetime64[ms]' ),
+    ('clean',       np.uint8),
+    ('clean_tilt',  np.uint8),
+    ('level',       np.uint8),
+    ('level_tilt',  np.uint8),
+    ('Hangle',      'f8'),
+    ('Vangle',      'f8'),
+    ('notes',       'U50')
+]
+# logbook column names by field
+_logbook_names = {
+    'date': ['date'],
+    'clean': ['clean','cleanliness','clean(pyr1)','clean1'],
+    'clean_tilt': ['clean_tilt','clean2','clean(pyr2)'],
+    'level': ['level','level(pyr1)','level1'],
+    'level_tilt': ['level_tilt','level(pyr2)','level2'],
+    'box': ['box','station','id','pyrbox','pyranometerbox'],
+    'Hangle': ['hangle','azimuth','azi','horizontal_angle'],
+    'Vangle': ['vangle','zenith','zen','vertical_angle'],
+    'notes': ['notes','note','description'],
+    'serial_pyr': ['serial','serial1','serial_pyr','pyranometerID','pyrID'],
+    'serial_pyr_tilt': ['serial2','serial_pyr2','serial_pyr_tilt'],
+    'site': ['site','location'],
+    'user': ['user','author'],
+    'campaign': ['campaign'],
+}
+_logbook_fields = {name: key for key, names in _logbook_names.items() for name in names}
+
+def _read_logbook_records(lfile):
+    """ Read all sheets of the logbook file into one recarray, in order of the rows.
+    """
+    dtype = dict(_logbook_dtype)
+    records = []
+    df=pd.read_excel(lfile,sheet_name=None)#,engine='openpyxl')
+    for sheet in df.keys():# read all sheets from xls file
+        sh = df[sheet].dropna(axis=0,how='all',subset=['date']) #remove empty lines
+        sh = sh.dropna(axis=1,how='all') # remove empty columns
+        A = np.zeros(sh.shape[0], dtype=_logbook_dtype).view(np.recarray)
+        # map the header once, assign whole columns
+        for name in sh.columns:
+            key = _logbook_fields.get(str(name).lower().strip(), False)
+            if not key:
+                continue
+            if dtype[key] == np.uint8:
+                values = sh[name].to_numpy(dtype=float)
+                values = np.where(np.isnan(values), 9, values)
+            elif key == 'date':
+                values = pd.to_datetime(sh[name]).to_numpy().astype('datetime64[ms]')
+            else:
+                values = sh[name].to_numpy(dtype=object)
+            A[key] = values
+        records.append(A)
+    return np.concatenate(records).view(np.recarray)
+
 def read_logbook(lfile):
     '''
     Load logbook file and store it as dictionary of rec arrays with stID keys.
@@ -91,104 +151,42 @@ def read_logbook(lfile):
     logbook: dict
         dict of recarray for each station ID including quality flags from each maintenance cicle.
     '''
-    dtype_log =[
-        ('box',         np.uint8),
-        ('site',        'U50'),
-        ('serial_pyr',  'U50'),
-        ('serial_pyr_tilt', 'U50'),
-        ('user',          'U50'),
-        ('campaign',    'U50'),
-        ('date',        'datetime64[ms]' ),
-        ('clean',       np.uint8),
-        ('clean_tilt',  np.uint8),
-        ('level',       np.uint8),
-        ('level_tilt',  np.uint8),
-        ('Hangle',      'f8'),
-        ('Vangle',      'f8'),
-        ('notes',       'U50')
-    ]
-    def _parse_name(name):
-        key=name.lower().strip()
-        if key in ['date']:
-            return 'date'
-        elif key in ['clean','cleanliness','clean(pyr1)','clean1']:
-            return 'clean'
-        elif key in ['clean_tilt','clean2','clean(pyr2)']:
-            return 'clean_tilt'
-        elif key in ['level','level(pyr1)','level1']:
-            return 'level'
-        elif key in ['level_tilt','level(pyr2)','level2']:
-            return 'level_tilt'
-        elif key in ['box','station','id','pyrbox','pyranometerbox']:
-            return 'box'
-        elif key in ['hangle','azimuth','azi','horizontal_angle']:
-            return 'Hangle'
-        elif key in ['vangle','zenith','zen','vertical_angle']:
-            return 'Vangle'
-        elif key in ['notes','note','description']:
-            return 'notes'
-        elif key in ['serial','serial1','serial_pyr','pyranometerID','pyrID']:
-            return 'serial_pyr'
-        elif key in ['serial2','serial_pyr2','serial_pyr_tilt']:
-            return 'serial_pyr_tilt'
-        elif key in ['site','location']:
-            return 'site'
-        elif key in ['user','author']:
-            return 'user'
-        elif key in ['campaign']:
-            return 'campaign'
-        elif key == 'index':
-            return False
-        else:
-            return False
-    def _hstack2(arrays):
-        return arrays[0].__array_wrap__(np.hstack(arrays))
-
-    logbook={}
-    df=pd.read_excel(lfile,sheet_name=None)#,engine='openpyxl')
-    for sheet in df.keys():# read all sheets from xls file
-        sh = df[sheet].dropna(axis=0,how='all',subset=['date']) #remove empty lines
-        sh = sh.dropna(axis=1,how='all') # remove empty columns
-        for row in sh.itertuples(index=True,name='Pandas'):
-            A=np.zeros(1,dtype=dtype_log).view(np.recarray)
-            for name,value in row._asdict().items():
-                key=_parse_name(name)
-                if key:
-                    if dict(dtype_log)[key]==np.uint8 and np.isnan(value):
-                        value=9
-                    A[key]=value
-            if str(A.box[0]) in logbook.keys():
-                logbook.update({str(A.box[0]):_hstack2([logbook[str(A.box[0])],A])})
-            else:
-                logbook.update({str(A.box[0]):A})
+    A = _read_logbook_records(lfile)
+    # boxes in order of appearance
+    boxes, first = np.unique(A.box, return_index=True)
+    logbook = {}
+    for box in boxes[np.argsort(first)]:
+        logbook.update({str(box): A[A.box == box]})
     return logbook
 
 # %% ../../nbs/pyrnet/reports.ipynb 13
+def _marks_to_answers(marks):
+    """ Legacy marks 1-4 to LimeSurvey answer codes, others to 'None'.
+    """
+    marks = np.asarray(marks)
+    return np.where((marks >= 1) & (marks <= 4), np.char.add("AO0", marks.astype(str)), "None")
+
 def parse_legacy_logbook(fn):
-    df = None
-    lb = read_logbook(fn)
-    for box in lb:
-        lbb = lb[box]
-        N = lbb['date'].shape[0]
-        faccept = [1,2,3,4]
-        dfb = pd.DataFrame(
-            {"datestamp": lbb['date'],
-             "Q00": box,
-             "Q01": lbb['notes'],
-             "MainQ01[comment]": np.repeat("",N),
-             "MainQ02[comment]": np.repeat("",N),
-             "ExtraQ01[comment]": np.repeat("",N),
-             "ExtraQ02[comment]": np.repeat("",N),
-             "MainQ01": [f"AO0{f}" if f in faccept else "None" for f in lbb['clean']],
-             "MainQ02": [f"AO0{f}" if f in faccept else "None" for f in lbb['level']],
-             "ExtraQ01": [f"AO0{f}" if f in faccept else "None" for f in lbb['clean_tilt']],
-             "ExtraQ02": [f"AO0{f}" if f in faccept else "None" for f in lbb['level_tilt']],
-             }
-        )
-        if df is None:
-            df = dfb.copy()
-        else:
-            df = pd.concat((df,dfb),ignore_index=True)
+    A = _read_logbook_records(fn)
+    # group by box in order of appearance, keep order of rows per box
+    boxes, first, inverse = np.unique(A.box, return_index=True, return_inverse=True)
+    rank = np.argsort(np.argsort(first))
+    A = A[np.argsort(rank[inverse], kind="stable")]
+    N = A.shape[0]
+    df = pd.DataFrame(
+        {"datestamp": A['date'],
+         "Q00": A['box'].astype(str),
+         "Q01": A['notes'],
+         "MainQ01[comment]": np.repeat("",N),
+         "MainQ02[comment]": np.repeat("",N),
+         "ExtraQ01[comment]": np.repeat("",N),
+         "ExtraQ02[comment]": np.repeat("",N),
+         "MainQ01": _marks_to_answers(A['clean']),
+         "MainQ02": _marks_to_answers(A['level']),
+         "ExtraQ01": _marks_to_answers(A['clean_tilt']),
+         "ExtraQ02": _marks_to_answers(A['level_tilt']),
+         }
+    )
     df = df.fillna("None")
     return df
 
@@ -220,6 +218,37 @@ _mark_keys = {
     "align2": "ExtraQ02",
 }
 
+def index_report(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build an index of the survey report for fast lookup of many maintenance dates.
+
+    Reports are sorted by box number and datestamp and the quality marks are mapped to integers.
+
+    Parameters
+    ----------
+    df: Dataframe
+        LimeSurvey response parsed as pandas Dataframe.
+
+    Returns
+    -------
+    pd.Dataframe
+        Report index with columns 'box', 'datestamp' and the mark and note keys of `parse_report`.
+    """
+    index = pd.DataFrame({
+        "box": df["Q00"].values.astype(int),
+        "datestamp": pd.to_datetime(df["datestamp"]).values,
+    })
+    for mkey, col in _mark_keys.items():
+        marks = _pollution_marks if mkey.startswith("clean") else _alignment_marks
+        # unknown marks are set to -1, `parse_report` raises only for reports in the window of a maintenance date
+        index[mkey] = df[col].map(marks).fillna(-1).values.astype(int)
+    for nkey, col in _note_keys.items():
+        index[nkey] = df[col].values
+    # stable sort to keep the order of reports with equal datestamp
+    index = index.sort_values(["box", "datestamp"], kind="stable").reset_index(drop=True)
+    index.attrs["report_index"] = True
+    return index
+
 def parse_report(
         df:  pd.DataFrame,
         date_of_maintenance: float | dt.datetime | np.datetime64 | None,
@@ -230,7 +259,8 @@ def parse_report(
     Parameters
     ----------
     df: Dataframe
-        LimeSurvey response parsed as pandas Dataframe.
+        LimeSurvey response parsed as pandas Dataframe, or report index from `index_report`.
+        If the report is parsed for many dates, build the index once to speed up the lookup.
     date_of_maintenance: float, datetime, datetime64 or None
         A rough date of maintenance (at least day resolution).
         If float, interpreted as Julian day from 2000-01-01T12:00.
@@ -241,53 +271,49 @@ def parse_report(
     dict
         Dictionary storing maintenance flags and notes by PyrNet box number.
     """
-    if date_of_maintenance is not None:
+    if not df.attrs.get("report_index", False):
+        df = index_report(df)
+
+    datestamp = df["datestamp"].values
+    if date_of_maintenance is None:
+        date_of_maintenance = np.max(datestamp)
+    else:
         date_of_maintenance = utils.to_datetime64(date_of_maintenance)
 
-    results = {}
-    for i in range(df.shape[0]):
-        box = int(df["Q00"].values[i])
-        key = f"{box:03d}"
-
-        # consider only reports -1 to +7 days around date of maintenance
-        mdate = pd.to_datetime(df['datestamp'][i])
-        if date_of_maintenance is None:
-            dtime = mdate - np.max(df['datestamp'])
-        else:
-            dtime = mdate - date_of_maintenance
-
-        if (dtime<np.timedelta64(-1,'D')) or (dtime>np.timedelta64(7,'D')):
-            continue
+    # consider only reports -1 to +7 days around date of maintenance
+    start = date_of_maintenance - np.timedelta64(1, 'D')
+    end = date_of_maintenance + np.timedelta64(7, 'D')
 
-        # store report in dictionary
-        if key not in results:
-            # initialize marks
-            for mkey in _mark_keys:
-                results = assoc_in(results, [key,mkey], 4)
-            # initialize notes
-            for nkey in _note_keys:
-                results = assoc_in(results, [key,nkey], "")
+    boxes, ibox = np.unique(df["box"].values, return_index=True)
+    ibox = np.append(ibox, len(df))
 
-        # merge notes if multiple reports exist
-        for nkey in _note_keys:
-            new_note = df[_note_keys[nkey]].values[i]
-            update_note = (results[key][nkey]+'; '+new_note).strip('; ')
-            results = assoc_in(results, [key,nkey], update_note)
+    results = {}
+    for box, i0, i1 in zip(boxes, ibox[:-1], ibox[1:]):
+        # reports of box sorted by datestamp
+        lo = i0 + np.searchsorted(datestamp[i0:i1], start, side='left')
+        hi = i0 + np.searchsorted(datestamp[i0:i1], end, side='right')
+        if lo == hi:
+            continue
 
+        report = {}
         # update marks with most recent report if not None
         for mkey in _mark_keys:
-            new_mark = df[_mark_keys[mkey]][i]
-            if new_mark=="None":
-                continue
-            if mkey.startswith("clean"):
-                new_mark = _pollution_marks[new_mark]
-            else:
-                new_mark = _alignment_marks[new_mark]
-            results = assoc_in(results, [key,mkey], new_mark)
+            marks = df[mkey].values[lo:hi]
+            if np.any(marks < 0):
+                raise ValueError(f"Unknown marks {mkey} in report of box {box} around {date_of_maintenance}.")
+            valid = marks[marks != 4]
+            report[mkey] = int(valid[-1]) if len(valid) > 0 else 4
+        # merge notes if multiple reports exist
+        for nkey in _note_keys:
+            note = ""
+            for new_note in df[nkey].values[lo:hi]:
+                note = (note+'; '+new_note).strip('; ')
+            report[nkey] = note
+        results[f"{box:03d}"] = report
     return results
 
 
-# %% ../../nbs/pyrnet/reports.ipynb 21
+# %% ../../nbs/pyrnet/reports.ipynb 23
 def get_qcflag(qc_clean, qc_level):
     """
     Aggregate quality flags.
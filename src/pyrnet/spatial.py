@@ -0,0 +1,130 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/spatial.ipynb.
+
+# %% auto 0
+__all__ = ['station_tree', 'radius_pairs', 'knn', 'binned_pairs', 'condensed_distances']
+
+# %% ../../nbs/pyrnet/spatial.ipynb 2
+from numpy.typing import ArrayLike, NDArray
+import numpy as np
+from scipy.spatial import cKDTree
+
+# %% ../../nbs/pyrnet/spatial.ipynb 5
+def station_tree(x: ArrayLike, y: ArrayLike) -> cKDTree:
+    """
+    Build a KD-tree of station coordinates.
+
+    Parameters
+    ----------
+    x: array_like
+        X coordinates, e.g., from `pyrnet.utils.get_xy_coords`.
+    y: array_like
+        Y coordinates.
+
+    Returns
+    -------
+    scipy.spatial.cKDTree
+    """
+    return cKDTree(np.column_stack((np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))))
+
+def radius_pairs(tree: cKDTree, r: float) -> (NDArray, NDArray):
+    """
+    Find all station pairs closer than a radius.
+
+    Parameters
+    ----------
+    tree: scipy.spatial.cKDTree
+        KD-tree of station coordinates, see `station_tree`.
+    r: float
+        Maximum distance.
+
+    Returns
+    -------
+    pairs: ndarray
+        Station indices (i, j) with i < j of shape (M, 2).
+    dist: ndarray
+        Distances of the pairs of shape (M,).
+    """
+    pairs = tree.query_pairs(r, output_type='ndarray')
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    dist = np.hypot(*(tree.data[pairs[:, 0]] - tree.data[pairs[:, 1]]).T)
+    return pairs, dist
+
+def knn(tree: cKDTree, k: int) -> (NDArray, NDArray):
+    """
+    Find the k nearest neighbours of each station, excluding the station itself.
+
+    Parameters
+    ----------
+    tree: scipy.spatial.cKDTree
+        KD-tree of station coordinates, see `station_tree`.
+    k: int
+        Number of neighbours.
+
+    Returns
+    -------
+    dist: ndarray
+        Distances of the neighbours of shape (N, k), sorted ascending.
+    idx: ndarray
+        Station indices of the neighbours of shape (N, k).
+    """
+    dist, idx = tree.query(tree.data, k=k+1)
+    # duplicates of a station may be returned before the station itself
+    hit = idx == np.arange(tree.n)[:, None]
+    # the station itself is missing, if it has more than k duplicates
+    hit[~hit.any(axis=1), -1] = True
+    return dist[~hit].reshape(-1, k), idx[~hit].reshape(-1, k)
+
+def binned_pairs(tree: cKDTree, bins: ArrayLike) -> (NDArray, NDArray, NDArray):
+    """
+    Find all station pairs with distances inside of distance bins, e.g., for variograms.
+
+    Parameters
+    ----------
+    tree: scipy.spatial.cKDTree
+        KD-tree of station coordinates, see `station_tree`.
+    bins: array_like
+        Monotonically increasing bin edges. Bins include the left edge.
+
+    Returns
+    -------
+    pairs: ndarray
+        Station indices (i, j) with i < j of shape (M, 2).
+    dist: ndarray
+        Distances of the pairs of shape (M,).
+    ibin: ndarray
+        Index of the distance bin of each pair of shape (M,).
+    """
+    bins = np.asarray(bins, dtype=np.float64)
+    pairs, dist = radius_pairs(tree, bins[-1])
+    ibin = np.digitize(dist, bins) - 1
+    m = (ibin >= 0) & (ibin < bins.size - 1)
+    return pairs[m], dist[m], ibin[m]
+
+# %% ../../nbs/pyrnet/spatial.ipynb 7
+def condensed_distances(x: ArrayLike, y: ArrayLike, dtype=np.float32) -> NDArray:
+    """
+    Euclidian distances of all station pairs in condensed form.
+
+    Parameters
+    ----------
+    x: array_like
+        X coordinates
+    y: array_like
+        Y coordinates
+    dtype: numpy dtype
+        Data type of the result. The default is float32.
+
+    Returns
+    -------
+    ndarray
+        Distances of shape (N*(N-1)/2,).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.size
+    out = np.empty(n*(n-1)//2, dtype=dtype)
+    for i in range(n-1):
+        # start of row i in condensed form
+        k = i*n - i*(i+1)//2
+        out[k:k+n-i-1] = np.hypot(x[i+1:] - x[i], y[i+1:] - y[i])
+    return out
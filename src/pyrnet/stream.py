@@ -0,0 +1,215 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/stream.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'rls_update', 'stream_averages', 'follow']
+
+# %% ../../nbs/pyrnet/stream.ipynb 2
+import time
+import logging
+from collections import deque
+from collections.abc import Iterable, Iterator
+import numpy as np
+import pandas as pd
+
+from . import logger as pyrlogger
+from . import data as pyrdata
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/stream.ipynb 5
+def rls_update(theta: np.ndarray, P: np.ndarray, x: float, y: float, forgetting: float = 1.) -> (np.ndarray, np.ndarray):
+    """
+    One step of a recursive least squares fit of y = theta[0]*x + theta[1].
+
+    Parameters
+    ----------
+    theta: ndarray(2)
+        Current estimate of slope and intercept.
+    P: ndarray(2,2)
+        Current (scaled) covariance of the estimate.
+    x, y: float
+        New observation.
+    forgetting: float
+        Forgetting factor in (0, 1]. Values < 1 weight recent observations higher,
+        e.g., to track a temperature dependent drift. The default is 1, which results in the ordinary least squares fit.
+
+    Returns
+    -------
+    theta, P: ndarray
+        Updated estimate and covariance.
+    """
+    phi = np.array([x, 1.])
+    Pphi = P @ phi
+    k = Pphi / (forgetting + phi @ Pphi)
+    theta = theta + k * (y - phi @ theta)
+    P = (P - np.outer(k, Pphi)) / forgetting
+    return theta, P
+
+# %% ../../nbs/pyrnet/stream.ipynb 8
+def stream_averages(lines: Iterable[str],
+                    *,
+                    date_of_measure: np.datetime64 = np.datetime64('now'),
+                    freq: str = '1s',
+                    forgetting: float = 1.,
+                    calibration: list|None = None,
+                    maxbuffer: int = 600) -> Iterator[dict]:
+    """
+    Bin averages of ADC samples from a stream of logger lines.
+
+    Parameters
+    ----------
+    lines: iterable of str
+        Lines of the logger output, e.g., an open file, a pipe or `follow`.
+    date_of_measure: numpy.datetime64
+        Date of measurement to account for gps rollover.
+    freq: str
+        Width of the time bins. The default is '1s'.
+    forgetting: float
+        Forgetting factor of the clock drift estimate, see `rls_update`. The default is 1.
+    calibration: list or None
+        Calibration factors [uV W-1 m2] of ghi and gti, e.g., from `pyrnet.pyrnet.meta_lookup`.
+        If given, ghi and gti are in W m-2, else in V.
+    maxbuffer: int
+        Maximum number of ADC samples buffered until the first GPS record.
+        Earlier samples are dropped. The default is 600.
+
+    Yields
+    ------
+    dict
+        Start of the bin 'time', number of ADC 'samples', average of the ADC variables
+        (see `pyrnet.data.to_l1a`) and the last GPS position 'lat', 'lon',
+        the current estimate of the clock 'drift' [s/day] and the number of GPS records 'ngps'.
+    """
+    date_of_measure = utils.to_datetime64(date_of_measure)
+    width = pd.to_timedelta(freq) / pd.Timedelta(1, 'ms')
+    # ADC variables (column, scale_factor, add_offset)
+    adc_vars = dict(pyrdata._adc_vars)
+    if calibration is not None:
+        for i, var in enumerate(["ghi", "gti"]):
+            if i < len(calibration) and calibration[i] is not None:
+                col, scale, offset = adc_vars[var]
+                adc_vars[var] = (col, scale * 1e6 / calibration[i], offset * 1e6 / calibration[i])
+
+    # clock state: elapsed ADC time [ms], number of samples, RLS estimate
+    msec, elapsed, ncols = None, 0., None
+    theta, P = np.zeros(2), np.diag([1e4, 1e12])
+    gps0, pending, ngps = None, None, 0
+    lat, lon = np.nan, np.nan
+    buffer = deque(maxlen=maxbuffer)
+    # current bin
+    ibin, sums, count = None, None, 0
+
+    def emit(ibin, sums, count):
+        mean = sums / count
+        rec = {"time": base + np.timedelta64(int(ibin * width), 'ms'), "samples": count}
+        for var, (col, scale, offset) in adc_vars.items():
+            rec[var] = mean[col] * scale + offset if col < mean.size else np.nan
+        drift = (1. / (1. + theta[0] / 3.6e6) - 1.) * 86400.
+        rec.update({"lat": lat, "lon": lon, "drift": drift, "ngps": ngps})
+        return rec
+
+    def add(x, r):
+        nonlocal ibin, sums, count
+        # time of the sample relative to gps0
+        t = x + theta[0] * x / 3.6e6 + theta[1]
+        b = int(np.floor((t + offset) / width))
+        if ibin is None:
+            ibin, sums, count = b, np.zeros(r.size), 0
+        if b > ibin:
+            rec = emit(ibin, sums, count)
+            ibin, sums, count = b, np.zeros(r.size), 0
+        else:
+            # bins are closed, samples shifted to the past by a new estimate are added to the current bin
+            rec = None
+        sums += r
+        count += 1
+        return rec
+
+    for line in lines:
+        line = line.rstrip()
+        m = pyrlogger._re_gprmc.match(line)
+        if m:
+            gps = pyrlogger.parse_gprmc(m.group(2), date_of_measure)
+            if not np.isnat(gps[0]):
+                if gps0 is None:
+                    # bins are aligned to multiples of the bin width
+                    gps0 = gps[0]
+                    offset = ((gps0 - gps0.astype('datetime64[D]')) / np.timedelta64(1, 'ms')) % width
+                    base = gps0 - np.timedelta64(int(offset), 'ms')
+                pending = (gps[0] - gps0) / np.timedelta64(1, 'ms')
+                lat, lon = gps[2], gps[3]
+            continue
+        if not pyrlogger._re_adc.match(line):
+            # unhandled record...
+            continue
+        r = np.array(pyrlogger.parse_adc(line), dtype=np.float64)
+        if ncols is None:
+            ncols = r.size
+        if r.size != ncols:
+            # incomplete line
+            continue
+        # elapsed ADC time from the millisecond counter
+        if msec is not None:
+            dt = r[0] - msec
+            elapsed += dt + 1000 if dt < -850 else dt
+        msec = r[0]
+
+        if pending is not None:
+            # the first ADC sample after a GPS record is assumed to have the GPS time
+            theta, P = rls_update(theta, P, elapsed / 3.6e6, pending - elapsed, forgetting)
+            pending = None
+            ngps += 1
+
+        if gps0 is None:
+            if len(buffer) == buffer.maxlen:
+                logger.warning("No GPS record yet, drop ADC sample.")
+            buffer.append((elapsed, r))
+            continue
+        while buffer:
+            rec = add(*buffer.popleft())
+            if rec is not None:
+                yield rec
+        rec = add(elapsed, r)
+        if rec is not None:
+            yield rec
+
+    if count > 0:
+        yield emit(ibin, sums, count)
+
+# %% ../../nbs/pyrnet/stream.ipynb 13
+def follow(fname: str, *, interval: float = 1., timeout: float|None = None) -> Iterator[str]:
+    """
+    Yield the lines of a file, which is still written, like ``tail -f``.
+
+    Parameters
+    ----------
+    fname: str
+        The filename of the logger file.
+    interval: float
+        Seconds to wait for new lines at the end of the file. The default is 1.
+    timeout: float or None
+        Stop, if no new line is written for this number of seconds. The default is None, which waits forever.
+
+    Yields
+    ------
+    str
+        Complete lines of the file.
+    """
+    with open(fname, 'r', errors='ignore') as f:
+        partial = ""
+        waited = 0.
+        while True:
+            line = f.readline()
+            if line == "":
+                if timeout is not None and waited >= timeout:
+                    return
+                time.sleep(interval)
+                waited += interval
+                continue
+            waited = 0.
+            partial += line
+            # wait for the rest of incomplete lines
+            if partial.endswith("\n"):
+                yield partial
+                partial = ""
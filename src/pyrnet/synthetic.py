@@ -0,0 +1,205 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/synthetic.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'nmea_checksum', 'write_logger_file']
+
+# %% ../../nbs/pyrnet/synthetic.ipynb 2
+import gzip
+import logging
+import numpy as np
+import pandas as pd
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/synthetic.ipynb 5
+_gps_rollover = np.datetime64("2019-04-06")
+
+def nmea_checksum(sentence: str) -> str:
+    """
+    Checksum of a NMEA sentence.
+
+    Parameters
+    ----------
+    sentence: str
+        The NMEA sentence without leading '$' and trailing checksum, e.g. 'GPRMC,...'.
+
+    Returns
+    -------
+    str
+        Two digit hexadecimal XOR checksum.
+    """
+    cs = 0
+    for c in sentence.encode("ascii"):
+        cs ^= c
+    return f"{cs:02X}"
+
+def _gprmc_lines(time, lat, lon, valid):
+    """ GPRMC lines with logger prefix of GPS epochs *time*.
+    """
+    time = np.asarray(time).astype("datetime64[ms]")
+    # account for the gps week rollover
+    rolled = np.where(time >= _gps_rollover, time - np.timedelta64(1024, 'W'), time)
+    lines = []
+    for s, la, lo, v in zip(np.datetime_as_string(rolled, unit='ms'), lat, lon, valid):
+        hhmmss = s[11:13] + s[14:16] + s[17:19]
+        if v:
+            sentence = "GPRMC,{}.{},A,{:02d}{:07.4f},{},{:03d}{:07.4f},{},0.00,0.00,{},,,A".format(
+                hhmmss, s[20:23],
+                int(abs(la)), (abs(la) % 1) * 60, "N" if la >= 0 else "S",
+                int(abs(lo)), (abs(lo) % 1) * 60, "E" if lo >= 0 else "W",
+                s[8:10] + s[5:7] + s[2:4],
+            )
+            prefix = s[0:4] + s[5:7] + s[8:10]
+        else:
+            # no GPS fix, logger clock is not set
+            sentence = f"GPRMC,{hhmmss}.{s[20:23]},V,,,,,0.00,0.00,080180,,,N"
+            prefix = "20800108"
+        lines.append(f"{prefix},{hhmmss} 0 ${sentence}*{nmea_checksum(sentence)}")
+    return lines
+
+# %% ../../nbs/pyrnet/synthetic.ipynb 8
+_header = [
+    "# - TROPOS - Pyranometer Network BOX {box}",
+    "#FIRMWARE: Logomatic Kwan v1.1 (modified Witthuhn 201803) Aug 23 2018 10:43:35",
+    "#    MAM setup: MAMCR=2, MAMTIM=4",
+    "#    SD Card Setup: result=3,   MID=3,   OID='SD',   PNM='SU02G',   PRV=128,   PSN=321248437",
+    "#    IDs: TROPOS_ID: A2013001{box:02d} ; BOX: {box} ; WTS: {box}  ",
+    "#        Pyr{box} - serial:S12128.{box:03d} ; Pyr{box} - serial:S12137.{box:03d}",
+    "#    Calibration: Pyr{box}: 7.460000 (201504) ; Pyr{box}: 7.590000 (201504)",
+    "# time [ms] , [counts]...",
+]
+
+def _adc_counts(time, lon, rng):
+    """ ADC counts (internal battery, ta, rh, ghi, battery, gti) with a diurnal cycle.
+    """
+    # local solar hour
+    hour = (time - time.astype("datetime64[D]")) / np.timedelta64(1, 'h') + lon / 15.
+    day = np.clip(np.sin(np.pi * (hour - 6.) / 12.), 0, None)
+    n = len(time)
+    counts = np.empty((n, 6))
+    counts[:, 0] = 836.                      # internal battery
+    counts[:, 1] = 270. + 40. * day          # ta, 288 K - 300 K
+    counts[:, 2] = 480. - 60. * day          # rh
+    counts[:, 3] = 694. * day**1.2           # ghi, ~1000 W m-2 at noon
+    counts[:, 4] = 1000.                     # battery
+    counts[:, 5] = 620. * day**1.2           # gti
+    counts += rng.normal(0., 1., counts.shape)
+    return np.clip(np.round(counts), 0, 1023).astype(int)
+
+def _damage(lines, corrupt, truncate, rng):
+    """ Replace a random byte by a non UTF-8 byte or cut the line at a random position.
+    """
+    for i in np.flatnonzero(rng.random(len(lines)) < corrupt):
+        l = lines[i]
+        j = rng.integers(len(l))
+        # surrogate escape to write a raw byte 0x80-0xff
+        lines[i] = l[:j] + chr(0xdc00 + int(rng.integers(0x80, 0x100))) + l[j + 1:]
+    for i in np.flatnonzero(rng.random(len(lines)) < truncate):
+        l = lines[i]
+        lines[i] = l[:rng.integers(len(l))]
+    return lines
+
+def write_logger_file(fname: str,
+                      start,
+                      duration,
+                      *,
+                      rate: int = 10,
+                      drift: float = 0.,
+                      gps_dropout: float = 0.,
+                      corrupt: float = 0.,
+                      truncate: float = 0.,
+                      box: int = 9,
+                      lat: float = 51.35,
+                      lon: float = 12.43,
+                      seed: int|None = 0,
+                      chunksize: int = 36000) -> dict:
+    """
+    Write a synthetic raw logger file.
+
+    Parameters
+    ----------
+    fname: str
+        Path of the output file. If it ends with '.gz', the file is gzip compressed.
+    start: datetime or datetime64
+        Time of the first ADC sample.
+    duration: str, timedelta or timedelta64
+        Duration of the measurement in logger time, e.g. '1h' or '7D'.
+    rate: int
+        Sample rate of the ADC [Hz]. The default is 10.
+        The sample interval has to be shorter than 150 ms, to unwrap the millisecond counter with `pyrnet.logger.get_adc_time`.
+    drift: float
+        Drift of the logger clock [s/day]. Positive values are a fast logger clock. The default is 0.
+    gps_dropout: float
+        Fraction of GPS records without fix (status 'V'). The default is 0.
+    corrupt: float
+        Fraction of lines with a byte replaced by a non UTF-8 byte. The default is 0.
+    truncate: float
+        Fraction of lines cut off at a random position, as caused by power cuts.
+        If > 0, also the last line of the file is cut off. The default is 0.
+    box: int
+        Box number written to the header. The default is 9.
+    lat, lon: float
+        Station coordinates [degN, degE].
+    seed: int or None
+        Seed of the random number generator. The default is 0.
+    chunksize: int
+        Number of ADC samples generated and written at once. The default is 36000.
+
+    Returns
+    -------
+    dict
+        Number of 'samples' (ADC records), 'gprmc' (valid GPS records) and 'lines' written.
+    """
+    start = utils.to_datetime64(start).astype("datetime64[ms]")
+    duration = pd.to_timedelta(duration).to_timedelta64().astype("timedelta64[ms]")
+    step = 1000 // rate
+    if 1000 % rate != 0 or step >= 150:
+        raise ValueError(f"Sample rate of {rate} Hz is not supported, the sample interval has to be an integer < 150 ms.")
+    rng = np.random.default_rng(seed)
+
+    n = int(duration / np.timedelta64(step, 'ms'))
+    # true sample interval of the drifting logger clock [ms]
+    true_step = step / (1. + drift / 86400.)
+    counter0 = int(rng.integers(1000))
+
+    stats = {"samples": n, "gprmc": 0, "lines": len(_header)}
+    f = gzip.open(fname, "wt", errors="surrogateescape") if fname.endswith(".gz") else \
+        open(fname, "w", errors="surrogateescape")
+    with f:
+        f.write("\n".join(_header).format(box=box) + "\n")
+        for k0 in range(0, n, chunksize):
+            k1 = min(k0 + chunksize, n)
+            k = np.arange(k0, k1 + 1)
+            tk = k * true_step
+            time = start + np.round(tk[:-1]).astype("timedelta64[ms]")
+
+            counts = _adc_counts(time, lon, rng)
+            ms = (counter0 + k[:-1] * step) % 1000
+            lines = [f"{c} " + " ".join(map(str, row)) for c, row in zip(ms.tolist(), counts.tolist())]
+
+            # GPS epochs at full seconds, after the last ADC sample before the epoch
+            e = np.arange(np.ceil(tk[0] / 1000.), np.ceil(tk[-1] / 1000.)) * 1000.
+            igps = np.searchsorted(tk[:-1], e, side='right')
+            valid = rng.random(len(e)) >= gps_dropout
+            jitter = rng.normal(0., 1e-5, (2, len(e)))
+            gprmc = _gprmc_lines(start + e.astype("timedelta64[ms]"), lat + jitter[0], lon + jitter[1], valid)
+            # merge ADC and GPS lines
+            isgps = np.zeros(len(lines) + len(gprmc), dtype=bool)
+            isgps[igps + np.arange(len(gprmc))] = True
+            merged = np.empty(len(isgps), dtype=object)
+            merged[~isgps] = lines
+            merged[isgps] = gprmc
+            lines = merged.tolist()
+
+            lines = _damage(lines, corrupt, truncate, rng)
+            if truncate > 0 and k1 == n:
+                # power cut at the end of the file
+                f.write("\n".join(lines[:-1]) + "\n" + lines[-1][:len(lines[-1]) // 2])
+            else:
+                f.write("\n".join(lines) + "\n")
+            stats["gprmc"] += int(np.sum(valid))
+            stats["lines"] += len(lines)
+    logger.info(f"Wrote synthetic logger file {fname}: {stats}")
+    return stats
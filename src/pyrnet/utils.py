@@ -1,21 +1,23 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/utils.ipynb.
 
 # %% auto 0
-__all__ = ['EPOCH_JD_2000_0', 'to_datetime64', 'read_json', 'pick', 'omit', 'get_var_attrs', 'get_attrs_enc', 'get_xy_coords',
-           'pairwise_distance_matrix', 'gauss_fwin_fwhm', 'gauss_fwin', 'smooth_fwhm', 'smooth']
+__all__ = ['EPOCH_JD_2000_0', 'to_datetime64', 'resource_filename', 'read_json', 'pick', 'omit', 'get_var_attrs', 'get_attrs_enc',
+           'get_xy_coords', 'pairwise_distance_matrix', 'gauss_fwin_fwhm', 'gauss_fwin', 'smooth_fwhm', 'smooth',
+           'smooth_multiscale', 'gauss_kernel_fwhm', 'smooth_fwhm_stream', 'smooth_stream', 'fill_gaps']
 
 # %% ../../nbs/pyrnet/utils.ipynb 2
 from numpy.typing import ArrayLike, NDArray
+import datetime
+import importlib.resources
 import numpy as np
-from scipy.signal.windows import gaussian
 import jstyleson as json
 from addict import Dict as adict
 from operator import itemgetter
 from toolz import keyfilter
-import pyproj
+from functools import lru_cache
 
-# python -m pip install git+https://github.com/hdeneke/trosat-base.git#egg=trosat-base
-import trosat.sunpos as sp
+# Heavy dependencies (scipy, pyproj, xarray, trosat) are imported inside the functions using them,
+# to keep the import of the package and the command line interface fast.
 
 # %% ../../nbs/pyrnet/utils.ipynb 5
 EPOCH_JD_2000_0 = np.datetime64("2000-01-01T12:00")
@@ -27,18 +29,41 @@ def to_datetime64(time, epoch=EPOCH_JD_2000_0):
     ----------
     time : list, ndarray, or scalar of type float, datetime or datetime64
         A representation of time. If float, interpreted as Julian date.
+        datetime64 is only cast to millisecond resolution, datetime objects are converted natively.
     epoch : np.datetime64, default JD2000.0
-        The epoch to use for the calculation
+        The epoch to use for the calculation of Julian dates
 
     Returns
     -------
     datetime64 or ndarray of datetime64
     """
-    jd = sp.to_julday(time, epoch=epoch)
+    # datetime, pandas.Timestamp and date objects
+    if isinstance(time, datetime.date):
+        return np.datetime64(time, 'ms')
+    # datetime64 scalars and arrays, pandas.DatetimeIndex, lists of datetime objects and strings
+    t = np.asarray(time)
+    if t.dtype.kind in 'MOUS':
+        try:
+            t = t.astype('datetime64[ms]')
+            return t[()] if t.ndim == 0 else t
+        except (ValueError, TypeError):
+            pass
+    # Julian date
+    if t.dtype.kind in 'fiu':
+        jd = t[()] if t.ndim == 0 else t
+    else:
+        # python -m pip install git+https://github.com/hdeneke/trosat-base.git#egg=trosat-base
+        import trosat.sunpos as sp
+        jd = sp.to_julday(time, epoch=epoch)
     jdms = np.int64(86_400_000*jd)
     return epoch + jdms.astype('timedelta64[ms]')
 
-# %% ../../nbs/pyrnet/utils.ipynb 8
+# %% ../../nbs/pyrnet/utils.ipynb 10
+def resource_filename(fname: str) -> str:
+    """ Path of a file shipped with the pyrnet package, e.g., 'share/pyrnet_config.json'.
+    """
+    return str(importlib.resources.files("pyrnet").joinpath(fname))
+
 def read_json(fpath: str, *, object_hook: type = adict, cls = None) -> dict:
     """ Parse json file to python dict.
     """
@@ -100,26 +125,69 @@ def get_attrs_enc(d : dict) -> (dict,dict):
     vencode = {k: pick(_enc_attrs, v) for k, v in d.items()}
     return vattrs, vencode
 
-# %% ../../nbs/pyrnet/utils.ipynb 13
+# %% ../../nbs/pyrnet/utils.ipynb 15
+@lru_cache(maxsize=1)
+def _get_geod():
+    """ WGS84 geodesic solver, created once.
+    """
+    import pyproj
+    return pyproj.Geod(ellps='WGS84')
+
+def _xy_coords(lon, lat, lonc, latc):
+    """ Solve the geodesic problem of the stations relative to the center.
+    """
+    lonc = np.broadcast_to(lonc, lon.shape)
+    latc = np.broadcast_to(latc, lat.shape)
+    az, _, d = _get_geod().inv(lonc, latc, lon, lat)
+    return d*np.sin(np.deg2rad(az)), d*np.cos(np.deg2rad(az))
+
+@lru_cache(maxsize=32)
+def _xy_coords_static(lon, lat, lonc, latc):
+    """ Memoized solver for static stations, positions are passed as tuples to be hashable.
+    """
+    x, y = _xy_coords(np.array(lon), np.array(lat), lonc, latc)
+    x.flags.writeable = False
+    y.flags.writeable = False
+    return x, y
+
 def get_xy_coords(lon, lat, lonc=None, latc=None):
     """
     Calculate Cartesian coordinates of network stations, relative to the mean
     lon/lat of the stations
-    """
-    GEOD = pyproj.Geod(ellps='WGS84')
 
-    n  = len(lon)
+    Parameters
+    ----------
+    lon: array_like
+        Longitudes of the stations, shape (stations,) or (stations, time) for moving stations.
+    lat: array_like
+        Latitudes of the stations, same shape as *lon*.
+    lonc: float, array_like or None
+        Longitude of the center, scalar or of shape (time,). If None, the mean of the stations (per time step) is used.
+    latc: float, array_like or None
+        Latitude of the center, scalar or of shape (time,). If None, the mean of the stations (per time step) is used.
+
+    Returns
+    -------
+    x, y: ndarray
+        Cartesian coordinates in m, same shape as *lon*. Results of static stations are memoized.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
     if lonc is None:
-        lonc = lon.mean()
+        lonc = lon.mean(axis=0)
     if latc is None:
-        latc = lat.mean()
-
-    az, _, d = np.array([GEOD.inv(lonc, latc, lon[i], lat[i]) for i in range(n)]).T
-    x = d*np.sin(np.deg2rad(az))
-    y = d*np.cos(np.deg2rad(az))
-    return x,y
-
-# %% ../../nbs/pyrnet/utils.ipynb 14
+        latc = lat.mean(axis=0)
+    lonc = np.asarray(lonc, dtype=np.float64)
+    latc = np.asarray(latc, dtype=np.float64)
+
+    if lon.ndim == 1 and lonc.ndim == 0 and latc.ndim == 0:
+        # static stations, the same positions are requested for every day of a campaign
+        x, y = _xy_coords_static(tuple(lon), tuple(lat), float(lonc), float(latc))
+        return x.copy(), y.copy()
+    # moving stations are not memoized, the positions differ for every request
+    return _xy_coords(lon, lat, lonc, latc)
+
+# %% ../../nbs/pyrnet/utils.ipynb 17
 def pairwise_distance_matrix( x: ArrayLike, y: ArrayLike ) -> NDArray:
     """
     Get square matrix with Euclidian distances of stations
@@ -140,7 +208,7 @@ def pairwise_distance_matrix( x: ArrayLike, y: ArrayLike ) -> NDArray:
     y = np.array(y)
     return np.sqrt( (x[None,:]-x[:,None])**2+(y[None,:]-y[:,None])**2 )
 
-# %% ../../nbs/pyrnet/utils.ipynb 20
+# %% ../../nbs/pyrnet/utils.ipynb 23
 def gauss_fwin_fwhm(fwhm: float, N: int = 86400) -> NDArray:
     """
     Convert scale parameter to FWHM of Normal distribution see
@@ -159,6 +227,7 @@ def gauss_fwin_fwhm(fwhm: float, N: int = 86400) -> NDArray:
     ndarray
         Frequency response of the gaussian window
     """
+    from scipy.signal.windows import gaussian
     f = 2.0*np.sqrt(2*np.log(2))
     sig = fwhm/f
     g  = gaussian(N, sig, sym=False)/np.sqrt(2*np.pi)/sig
@@ -187,7 +256,7 @@ def gauss_fwin(J: float, N: int=86400) -> NDArray:
 
 
 
-# %% ../../nbs/pyrnet/utils.ipynb 22
+# %% ../../nbs/pyrnet/utils.ipynb 25
 def smooth_fwhm(y: ArrayLike, fwhm: float, axis: int = 0) -> NDArray:
     """
     Smooth data with gaussian window by convolution
@@ -234,3 +303,259 @@ def smooth(y: ArrayLike, J: float, axis: int = 0) -> NDArray:
     fwhm = 60.*2**J
     return smooth_fwhm(y, fwhm, axis=axis)
 
+
+# %% ../../nbs/pyrnet/utils.ipynb 29
+@lru_cache(maxsize=64)
+def _gauss_rfwin(fwhm, N, dtype):
+    """ Real FFT frequency response of the gaussian window, cached.
+    """
+    from scipy.signal.windows import gaussian
+    from scipy import fft as spfft
+    f = 2.0*np.sqrt(2*np.log(2))
+    sig = fwhm/f
+    g = gaussian(N, sig, sym=False)/np.sqrt(2*np.pi)/sig
+    W = spfft.rfft(np.roll(g, np.floor_divide(N, 2)).astype(dtype))
+    W.flags.writeable = False
+    return W
+
+def smooth_multiscale(y: ArrayLike, J: ArrayLike|None = None, fwhm: ArrayLike|None = None,
+                      axis: int = 0, fast_len: bool = True) -> NDArray:
+    """
+    Smooth data with gaussian windows of several scales by convolution
+
+    Parameters
+    ----------
+    y: array_like
+        Input array.
+    J: array_like or None
+        Scale parameters for the FWHM (FWHM=60*2**J) of the gaussian windows. Either *J* or *fwhm* is required.
+    fwhm: array_like or None
+        FWHM of the gaussian windows.
+    axis: int, optional
+        Axis over which to smoothing is applied.
+    fast_len: bool, optional
+        Pad the data by reflection by the support of the widest window and to a fast FFT length.
+        If False, the results equal `smooth`. The default is True.
+
+    Returns
+    -------
+    ndarray
+        Smoothed arrays of shape (scales, *y.shape).
+    """
+    from scipy import fft as spfft
+    if (J is None) == (fwhm is None):
+        raise ValueError("Either J or fwhm is required.")
+    fwhms = 60.*2**np.atleast_1d(np.asarray(J, dtype=np.float64)) if fwhm is None else np.atleast_1d(fwhm)
+
+    y = np.asarray(y)
+    if not np.issubdtype(y.dtype, np.floating):
+        y = y.astype(np.float64)
+    axis = axis % y.ndim
+    N = y.shape[axis]
+    if fast_len:
+        # pad each edge by the support of the widest window, before rounding up to a fast length
+        npad = int(np.ceil(4*np.max(fwhms)/(2.0*np.sqrt(2*np.log(2)))))
+        M = spfft.next_fast_len(N + 2*npad, real=True)
+        while M % 2:
+            # the window is centered on a sample for even lengths only
+            M = spfft.next_fast_len(M + 1, real=True)
+    else:
+        M = N
+    if M > N:
+        pad = [(0, 0)]*y.ndim
+        pad[axis] = ((M-N)//2, M-N-(M-N)//2)
+        y = np.pad(y, pad, mode='reflect' if N > 1 else 'edge')
+    i0 = (M-N)//2
+
+    Y = spfft.rfft(y, axis=axis)
+    wshape = [1]*y.ndim
+    wshape[axis] = -1
+    out = np.empty((fwhms.size,) + y.shape[:axis] + (N,) + y.shape[axis+1:], dtype=y.dtype)
+    for k, f in enumerate(fwhms):
+        W = _gauss_rfwin(float(f), M, y.dtype).reshape(wshape)
+        ys = spfft.irfft(Y*W, n=M, axis=axis)
+        out[k] = np.take(ys, np.arange(i0, i0+N), axis=axis)
+    return out
+
+# %% ../../nbs/pyrnet/utils.ipynb 32
+# scipy.ndimage modes to numpy.pad modes
+_stream_pad_modes = {'reflect': 'symmetric', 'mirror': 'reflect', 'nearest': 'edge', 'constant': 'constant'}
+
+def gauss_kernel_fwhm(fwhm: float, truncate: float = 4.0) -> NDArray:
+    """
+    Normalized gaussian kernel, truncated at *truncate* standard deviations.
+
+    Parameters
+    ----------
+    fwhm: float
+        FWHM of the gaussian kernel
+    truncate: float
+        Truncate the kernel at this many standard deviations. The default is 4.
+
+    Returns
+    -------
+    ndarray
+        Gaussian kernel of odd length, summing up to 1.
+    """
+    sig = fwhm/(2.0*np.sqrt(2*np.log(2)))
+    r = int(truncate*sig + 0.5)
+    x = np.arange(-r, r+1)
+    g = np.exp(-0.5*(x/sig)**2)
+    return g/np.sum(g)
+
+def _iter_blocks(data, block):
+    """ Iterate over blocks of the first dimension.
+    """
+    import xarray as xr
+    if isinstance(data, xr.DataArray):
+        sizes = data.chunks[0] if data.chunks is not None else [block]*(-(-data.shape[0]//block))
+        i0 = 0
+        for n in sizes:
+            yield data[i0:i0+n].values
+            i0 += n
+    elif isinstance(data, np.ndarray):
+        for i0 in range(0, data.shape[0], block):
+            yield data[i0:i0+block]
+    else:
+        yield from data
+
+def smooth_fwhm_stream(data, fwhm: float, mode: str = 'reflect', cval: float = 0.,
+                       truncate: float = 4.0, block: int = 86400):
+    """
+    Smooth a stream of data with gaussian window by overlap-save convolution
+
+    Parameters
+    ----------
+    data: iterable of array_like, ndarray or xarray.DataArray
+        Blocks of the input series, or an array processed in blocks along the first axis.
+    fwhm: float
+        FWHM of the gaussian window to be convolved with the input.
+    mode: str
+        Edge handling as in `scipy.ndimage.gaussian_filter1d`, one of 'reflect' (d c b a | a b c d),
+        'mirror' (d c b | a b c d), 'nearest' (a a a | a b c d) or 'constant' (k k k | a b c d).
+        The default is 'reflect'.
+    cval: float
+        Value outside the edges for mode 'constant'. The default is 0.
+    truncate: float
+        Truncate the kernel at this many standard deviations. The default is 4.
+    block: int
+        Block size if *data* is an array or not chunked. The default is 86400.
+
+    Yields
+    ------
+    ndarray
+        Smoothed blocks. Concatenated along the first axis, they have the shape of the input.
+    """
+    from scipy.signal import fftconvolve
+    if mode not in _stream_pad_modes:
+        raise ValueError(f"mode {mode} not implemented.")
+    kw = {'constant_values': cval} if mode == 'constant' else {}
+    pmode = _stream_pad_modes[mode]
+
+    h = gauss_kernel_fwhm(fwhm, truncate=truncate)
+    r = h.size // 2
+    buf = None
+    started = False
+    for chunk in _iter_blocks(data, block):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.shape[0] == 0:
+            continue
+        buf = chunk if buf is None else np.concatenate((buf, chunk), axis=0)
+        pad = [(0, 0)]*buf.ndim
+        if not started:
+            # wait for enough samples for the left edge
+            if buf.shape[0] <= r:
+                continue
+            pad[0] = (r, 0)
+            buf = np.pad(buf, pad, mode=pmode, **kw)
+            started = True
+        if buf.shape[0] < h.size:
+            continue
+        kernel = h.reshape((-1,) + (1,)*(buf.ndim-1))
+        yield fftconvolve(buf, kernel, mode='valid', axes=0)
+        buf = buf[buf.shape[0]-2*r:]
+
+    if buf is None:
+        return
+    pad = [(0, 0)]*buf.ndim
+    pad[0] = (0 if started else r, r)
+    buf = np.pad(buf, pad, mode=pmode, **kw)
+    kernel = h.reshape((-1,) + (1,)*(buf.ndim-1))
+    yield fftconvolve(buf, kernel, mode='valid', axes=0)
+
+def smooth_stream(data, J: float, **kwargs):
+    """
+    Smooth a stream of data with gaussian window by overlap-save convolution
+
+    Parameters
+    ----------
+    data: iterable of array_like, ndarray or xarray.DataArray
+        Blocks of the input series, or an array processed in blocks along the first axis.
+    J: float
+        Scale parameter for the FWHM (FWHM=60*2**J) of the gaussian window.
+    kwargs:
+        Passed to `smooth_fwhm_stream`.
+
+    Yields
+    ------
+    ndarray
+        Smoothed blocks.
+    """
+    yield from smooth_fwhm_stream(data, 60.*2**J, **kwargs)
+
+# %% ../../nbs/pyrnet/utils.ipynb 35
+def fill_gaps(x: ArrayLike, y: ArrayLike, valid: ArrayLike|None = None, max_gap: int|None = None) -> NDArray:
+    """
+    Fill gaps by linear interpolation along the first axis, vectorized over all other axes.
+
+    Parameters
+    ----------
+    x: array_like
+        Sample coordinates of shape (N,), monotonically increasing.
+    y: array_like
+        Samples of shape (N, ...).
+    valid: array_like or None
+        Boolean mask of valid samples, same shape as *y*. If None, finite samples are valid.
+    max_gap: int or None
+        Maximum number of consecutive missing samples to fill. Longer gaps, including gaps at the edges,
+        are left unchanged. If None, all gaps are filled. The default is None.
+
+    Returns
+    -------
+    ndarray
+        Copy of *y* with filled gaps. Columns with less than two valid samples are left unchanged.
+    """
+    x = np.asarray(x)
+    y = np.array(y)
+    if not np.issubdtype(y.dtype, np.inexact):
+        y = y.astype(np.float64)
+    valid = np.isfinite(y) if valid is None else np.asarray(valid, dtype=bool)
+    shape = y.shape
+    y = y.reshape(shape[0], -1)
+    valid = valid.reshape(shape[0], -1)
+    n = shape[0]
+
+    # index of previous and next valid sample
+    idx = np.arange(n)[:, None]
+    prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=0)
+    nxt = np.minimum.accumulate(np.where(valid, idx, n)[::-1], axis=0)[::-1]
+
+    # first two and last two valid samples for extrapolation
+    cols = np.arange(y.shape[1])
+    first = nxt[0]
+    second = nxt[np.minimum(first + 1, n - 1), cols]
+    last = prev[-1]
+    second_last = prev[np.maximum(last - 1, 0), cols]
+
+    fill = ~valid & (np.sum(valid, axis=0) >= 2)[None, :]
+    if max_gap is not None:
+        gap = np.where(prev < 0, nxt, np.where(nxt >= n, n - 1 - prev, nxt - prev - 1))
+        fill &= gap <= max_gap
+    i, j = np.nonzero(fill)
+    lo = np.where(prev[i, j] < 0, first[j], np.where(nxt[i, j] >= n, second_last[j], prev[i, j]))
+    hi = np.where(prev[i, j] < 0, second[j], np.where(nxt[i, j] >= n, last[j], nxt[i, j]))
+
+    # same arithmetic as scipy.interpolate.interp1d
+    slope = (y[hi, j] - y[lo, j]) / (x[hi] - x[lo])
+    y[i, j] = slope*(x[i] - x[lo]) + y[lo, j]
+    return y.reshape(shape)
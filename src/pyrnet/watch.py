@@ -0,0 +1,300 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../../nbs/pyrnet/watch.ipynb.
+
+# %% auto 0
+__all__ = ['logger', 'poll', 'update_network_day', 'watch']
+
+# %% ../../nbs/pyrnet/watch.ipynb 2
+import os
+import re
+import time
+import glob
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from . import data as pyrdata
+from . import manifest as pyrmanifest
+
+logger = logging.getLogger(__name__)
+
+# %% ../../nbs/pyrnet/watch.ipynb 5
+def poll(paths: list[str], pattern: str, state: dict, *, settle: float = 60., now: float|None = None) -> list[str]:
+    """
+    Poll directories for new or grown files, which are stable.
+
+    Parameters
+    ----------
+    paths: list of str
+        Directories to poll.
+    pattern: str
+        Regular expression matching the file names.
+    state: dict
+        Size and modification time by file path, updated in place. Set 'done' of a file to its (size, mtime) after processing.
+    settle: float
+        Seconds since the last modification, for a file to be considered stable. The default is 60.
+    now: float or None
+        Current time in seconds since epoch. If None, `time.time()` is used.
+
+    Returns
+    -------
+    list of str
+        Paths of stable files, which are not processed in their current state.
+    """
+    now = time.time() if now is None else now
+    regex = re.compile(pattern)
+    ready = []
+    for path in paths:
+        try:
+            fnames = sorted(os.listdir(path))
+        except OSError as e:
+            # e.g. a missing or unmounted directory
+            logger.warning(f"Skip {path}: {e}")
+            continue
+        for fname in fnames:
+            if not regex.match(fname):
+                continue
+            fpath = os.path.abspath(os.path.join(path, fname))
+            try:
+                stat = os.stat(fpath)
+            except OSError as e:
+                # e.g. removed since listdir
+                logger.warning(f"Skip {fpath}: {e}")
+                continue
+            s = state.setdefault(fpath, {"done": None})
+            s.update({"size": stat.st_size, "mtime": stat.st_mtime})
+            if now - stat.st_mtime < settle:
+                continue
+            if s["done"] == (stat.st_size, stat.st_mtime):
+                continue
+            ready.append(fpath)
+    return ready
+
+# %% ../../nbs/pyrnet/watch.ipynb 7
+def _process_raw(fname, station, config, report, output_path):
+    """ Process one raw file to l1a and l1b (in a worker process).
+    """
+    ds = pyrdata.to_l1a(
+        fname=fname,
+        station=station,
+        date_of_measure=np.datetime64(config['date_of_measure']),
+        report=report,
+        config=config,
+        global_attrs=config['global_attrs']
+    )
+    if ds is None:
+        logger.warning(f"Skip {os.path.basename(fname)}.")
+        return None
+    l1a = os.path.join(output_path, "l1a", config['output_l1a'].format_map(dict(
+        startdt=pd.to_datetime(ds.gpstime.values[0]),
+        enddt=pd.to_datetime(ds.gpstime.values[-1]),
+        campaign=config['campaign'],
+        station=station,
+        collection=config['collection'],
+        sfx="nc"
+    )))
+    pyrdata.to_netcdf(ds, l1a, timevar="gpstime")
+    result = {"l1a": (l1a, ds.gpstime.values[-1]), "l1b": []}
+
+    ds = pyrdata.to_l1b(l1a, config=config, global_attrs=config['global_attrs'])
+    if ds is None:
+        return result
+    for day in np.unique(ds.time.values.astype("datetime64[D]")):
+        day = pd.to_datetime(day)
+        l1b = os.path.join(output_path, "l1b", config['output_l1b'].format_map(dict(
+            dt=day,
+            campaign=config['campaign'],
+            station=station,
+            collection=int(config['collection']),
+            sfx="nc"
+        )))
+        pyrdata.to_netcdf(ds.sel(time=f"{day:%Y-%m-%d}"), l1b)
+        result["l1b"].append((l1b, day.to_datetime64()))
+    return result
+
+def _remove_outputs(manifests, dirs, fname):
+    """ Remove the l1a and l1b outputs of a raw file recorded in the manifests.
+    A changed raw file is processed as a whole, its new outputs would conflict with the old ones.
+    """
+    l1a = [k for k, v in manifests["l1a"]["outputs"].items() if fname in v["inputs"]]
+    l1a = {os.path.abspath(os.path.join(dirs["l1a"], k)) for k in l1a}
+    # keep l1b files, which are merged from other l1a files too
+    l1b = [k for k, v in manifests["l1b"]["outputs"].items() if set(v["inputs"]) <= l1a]
+    for lvl, outputs in [("l1a", l1a), ("l1b", l1b)]:
+        for outfile in outputs:
+            outfile = os.path.join(dirs[lvl], os.path.basename(outfile))
+            manifests[lvl]["outputs"].pop(os.path.basename(outfile))
+            if os.path.exists(outfile):
+                logger.info(f"Remove {outfile}.")
+                os.remove(outfile)
+
+def update_network_day(day, l1b_files: list[str], config: dict, output_path: str) -> str:
+    """
+    Update the network file of a day with new or updated station files.
+
+    The station slots are overwritten in place (`pyrnet.data.update_network`). If the network
+    file does not exist, or a station is new, all station files of the day are merged.
+
+    Parameters
+    ----------
+    day: datetime64
+        Day of the network file.
+    l1b_files: list of str
+        New or updated l1b station files of the day.
+    config: dict
+        Processing config, see `pyrnet.data.get_config`.
+    output_path: str
+        Output path with sub directories 'l1b' and 'l1b_network'.
+
+    Returns
+    -------
+    str
+        Path of the network file.
+    """
+    day = pd.to_datetime(day)
+    fmt = dict(dt=day, campaign=config['campaign'], collection=int(config['collection']), sfx="nc")
+    fnet = os.path.join(output_path, "l1b_network", config['output_l1b_network'].format_map(fmt))
+    if os.path.exists(fnet):
+        try:
+            for fn in l1b_files:
+                with xr.open_dataset(fn) as dst:
+                    pyrdata.update_network(fnet, dst)
+            return fnet
+        except ValueError as e:
+            logger.info(f"{e}")
+
+    # merge all station files of the day
+    fnames = sorted(glob.glob(os.path.join(
+        output_path, "l1b", config['output_l1b'].replace("{station:03d}", "*").format_map(fmt))))
+    logger.info(f"Merge {len(fnames)} station files to {fnet}.")
+    ds = pyrdata.merge_network(fnames, freq=config['l1bfreq'])
+    ds = pyrdata.add_encoding(ds)
+    # replace the network file at once, it may be read at the same time
+    ds.to_netcdf(fnet + ".tmp")
+    os.replace(fnet + ".tmp", fnet)
+    return fnet
+
+# %% ../../nbs/pyrnet/watch.ipynb 9
+def watch(paths: list[str],
+          output_path: str,
+          *,
+          config: dict|None = None,
+          report: dict|pd.DataFrame|None = None,
+          interval: float = 30.,
+          settle: float = 60.,
+          jobs: int = 2,
+          once: bool = False):
+    """
+    Poll directories for raw files and process them to l1a, l1b and network l1b.
+
+    Parameters
+    ----------
+    paths: list of str
+        Directories to poll for raw files.
+    output_path: str
+        Output path, the sub directories 'l1a', 'l1b' and 'l1b_network' are created if necessary.
+    config: dict or None
+        Config to override the default config.
+    report: dict, pd.DataFrame or None
+        Maintenance report, as passed to `pyrnet.data.to_l1a`.
+    interval: float
+        Seconds between two polls. The default is 30.
+    settle: float
+        Seconds a file has to be unchanged, to be processed. The default is 60.
+    jobs: int
+        Number of worker processes. The default is 2.
+    once: bool
+        If True, poll and process only once. The default is False.
+    """
+    config = pyrdata.get_config(config)
+    parse = re.compile(config['filename_parser'])
+    dirs = {lvl: os.path.join(output_path, lvl) for lvl in ["l1a", "l1b", "l1b_network"]}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    manifests = {lvl: pyrmanifest.read_manifest(dirs[lvl]) for lvl in ["l1a", "l1b"]}
+    dependencies = {
+        "l1a": lambda station, date: pyrmanifest.l1a_dependencies(config, station, date, report=report),
+        "l1b": lambda station, date: pyrmanifest.l1b_dependencies(config, station, date),
+    }
+
+    state = {}
+    total = {"files": 0, "busy": 0., "latency": []}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while True:
+            t0 = time.time()
+            futures = {}
+            try:
+                ready = poll(paths, config['filename_parser'], state, settle=settle)
+            except Exception:
+                logger.exception("Polling failed.")
+                ready = []
+            for fn in ready:
+                m = parse.match(os.path.basename(fn))
+                try:
+                    station = int(m.group('ID'))
+                except:
+                    logger.warning(f"Could not find station id in filename {fn}.")
+                    state[fn]["done"] = (state[fn]["size"], state[fn]["mtime"])
+                    continue
+                try:
+                    if pyrmanifest.is_up_to_date(manifests["l1a"], dirs["l1a"], fn, dependencies["l1a"]):
+                        state[fn]["done"] = (state[fn]["size"], state[fn]["mtime"])
+                        continue
+                    logger.info(f"Process {fn}.")
+                    _remove_outputs(manifests, dirs, fn)
+                except Exception:
+                    logger.exception(f"Processing of {fn} failed.")
+                    continue
+                futures[pool.submit(_process_raw, fn, station, config, report, output_path)] = (fn, station)
+
+            days = {}
+            mtimes = []
+            for future in as_completed(futures):
+                fn, station = futures[future]
+                # process again, if the file is changed
+                state[fn]["done"] = (state[fn]["size"], state[fn]["mtime"])
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception(f"Processing of {fn} failed.")
+                    continue
+                if result is None:
+                    continue
+                mtimes.append(state[fn]["mtime"])
+                l1a, date = result["l1a"]
+                pyrmanifest.record_output(manifests["l1a"], l1a, inputs=[fn],
+                                          dependencies=dependencies["l1a"](station, date),
+                                          station=station, date=date)
+                for l1b, day in result["l1b"]:
+                    pyrmanifest.record_output(manifests["l1b"], l1b, inputs=[l1a],
+                                              dependencies=dependencies["l1b"](station, day),
+                                              station=station, date=day)
+                    days.setdefault(day, []).append(l1b)
+            for lvl in ["l1a", "l1b"]:
+                pyrmanifest.write_manifest(dirs[lvl], manifests[lvl])
+
+            for day, l1b_files in sorted(days.items()):
+                try:
+                    fnet = update_network_day(day, l1b_files, config, output_path)
+                except Exception:
+                    logger.exception(f"Update of the network file of {pd.to_datetime(day):%Y-%m-%d} failed.")
+                    continue
+                logger.info(f"Updated {fnet}.")
+
+            if len(mtimes) > 0:
+                t1 = time.time()
+                latency = [t1 - mtime for mtime in mtimes]
+                total["files"] += len(mtimes)
+                total["busy"] += t1 - t0
+                total["latency"] += latency
+                logger.info(
+                    f"Processed {len(mtimes)} files in {t1 - t0:.1f}s ({len(mtimes) / (t1 - t0):.3f} files/s), "
+                    f"{len(days)} network files updated, latency median {np.median(latency):.0f}s, max {np.max(latency):.0f}s. "
+                    f"Total: {total['files']} files, {total['files'] / total['busy']:.3f} files/s, "
+                    f"latency median {np.median(total['latency']):.0f}s, max {np.max(total['latency']):.0f}s."
+                )
+            if once:
+                break
+            time.sleep(max(0., interval - (time.time() - t0)))
+    return total